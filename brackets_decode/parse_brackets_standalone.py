@@ -10,22 +10,36 @@ import sys
 import os
 import json
 import struct
-import ctypes
 import pickle as cPickle  # Python 3: pickle (was cPickle in Python 2)
-import array
+import hashlib
+import mmap
+import bisect
 import collections
 import re
+import asyncio
 from contextlib import contextmanager
+from pathlib import Path
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from utils.http_client import get
 
+try:
+    import aiohttp
+except ImportError:  # 没有 aiohttp 时退回逐个同步下载
+    aiohttp = None
+
+try:
+    import orjson
+except ImportError:  # 没有 orjson 时退回标准库 json
+    orjson = None
+
 # ============================================================================
 # 基础结构体定义
 # ============================================================================
 
 uint64 = struct.Struct('Q')
 uint32 = struct.Struct('I')
+uint16 = struct.Struct('H')
 int32 = struct.Struct('i')
 keyedOffsetData = struct.Struct('ii')
 keyedOffsetDataWithSize = struct.Struct('iii')
@@ -45,6 +59,8 @@ vector4_double = struct.Struct('dddd')
 # ============================================================================
 
 class FsdDataPathObject(object):
+    __slots__ = ('name', 'parent')
+
     def __init__(self, name, parent=None):
         self.name = name
         self.parent = parent
@@ -56,6 +72,13 @@ class FsdDataPathObject(object):
             return self.name
 
 
+def ChildPath(extraState, parent, nameFormat, key):
+    """子节点路径只用于错误信息，仅在 extraState.tracePaths 打开时才构造，否则沿用父路径"""
+    if extraState.tracePaths:
+        return FsdDataPathObject(nameFormat % str(key), parent=parent)
+    return parent
+
+
 # ============================================================================
 # Telemetry 上下文（简化版，不依赖 blue）
 # ============================================================================
@@ -91,13 +114,13 @@ def readBinaryDataFromFileAtOffset(fileObject, offsetToData, sizeOfData):
     return fileObject.read(sizeOfData)
 
 
-def GetLargeEnoughUnsignedTypeForMaxValue(i):
+def GetLargeEnoughUnsignedStructForMaxValue(i):
     if i <= 255:
-        return ctypes.c_ubyte
+        return byte
     elif i <= 65536:
-        return ctypes.c_uint16
+        return uint16
     else:
-        return ctypes.c_uint32
+        return uint32
 
 
 # ============================================================================
@@ -105,6 +128,8 @@ def GetLargeEnoughUnsignedTypeForMaxValue(i):
 # ============================================================================
 
 class VectorLoader(object):
+    __slots__ = ('schema', 'data')
+
     def __init__(self, data, offset, schema, path, extraState):
         self.schema = schema
         single_precision = schema.get('precision', 'single') == 'single'
@@ -158,37 +183,41 @@ def Vector2FromBinaryString(data, offset, schema, path, extraState):
 
 def StringFromBinaryString(data, offset, schema, path, extraState):
     count = uint32.unpack_from(data, offset)[0]
-    result = struct.unpack_from(str(count) + 's', data, offset + 4)[0]
-    # Python 3: decode bytes to string
-    if isinstance(result, bytes):
-        return result.decode('utf-8', errors='ignore')
-    return result
+    start = offset + 4
+    # Python 3: 直接从缓冲区切片解码，不再为每个长度构造 struct 格式串
+    return str(data[start:start + count], 'utf-8', 'ignore')
+
+
+# 字符串在 Python 3 中统一为 unicode，两者解码方式相同
+UnicodeStringFromBinaryString = StringFromBinaryString
 
 
-def UnicodeStringFromBinaryString(data, offset, schema, path, extraState):
-    nonUnicodeString = StringFromBinaryString(data, offset, schema, path, extraState)
-    # StringFromBinaryString 已经返回字符串，这里直接返回
-    if isinstance(nonUnicodeString, bytes):
-        return nonUnicodeString.decode('utf-8', errors='ignore')
-    return nonUnicodeString
+def PrepareEnumSchema(schema):
+    """预先确定枚举的解包器，并建立 值 -> 名称 的反查表"""
+    schema['_enumUnpack'] = GetLargeEnoughUnsignedStructForMaxValue(schema['maxEnumValue']).unpack_from
+    enumNames = {}
+    for k, v in schema.get('values', {}).items():  # Python 3: items() instead of iteritems()
+        enumNames.setdefault(v, k)
+    schema['_enumNames'] = enumNames
 
 
 def EnumFromBinaryString(data, offset, schema, path, extraState):
-    enumType = GetLargeEnoughUnsignedTypeForMaxValue(schema['maxEnumValue'])
-    dataValue = ctypes.cast(ctypes.byref(data, offset), ctypes.POINTER(enumType)).contents.value
+    dataValue = schema['_enumUnpack'](data, offset)[0]
     if schema.get('readEnumValue', False):
         return dataValue
-    for k, v in schema['values'].items():  # Python 3: items() instead of iteritems()
-        if v == dataValue:
-            return k
+    return schema['_enumNames'].get(dataValue)
 
 
 def BoolFromBinaryString(data, offset, schema, path, extraState):
-    return byte.unpack(data[offset])[0] == 255
+    return byte.unpack_from(data, offset)[0] == 255
+
+
+def IsUnsignedIntSchema(schema):
+    return 'min' in schema and schema['min'] >= 0 or 'exclusiveMin' in schema and schema['exclusiveMin'] >= -1
 
 
 def IntFromBinaryString(data, offset, schema, path, extraState):
-    if 'min' in schema and schema['min'] >= 0 or 'exclusiveMin' in schema and schema['exclusiveMin'] >= -1:
+    if IsUnsignedIntSchema(schema):
         return uint32.unpack_from(data, offset)[0]
     else:
         return int32.unpack_from(data, offset)[0]
@@ -201,6 +230,50 @@ def FloatFromBinaryString(data, offset, schema, path, extraState):
         return cfloat.unpack_from(data, offset)[0]
 
 
+def _ScalarReader(unpacker):
+    unpack_from = unpacker.unpack_from
+
+    def ReadScalar(data, offset, schema, path, extraState):
+        return unpack_from(data, offset)[0]
+    return ReadScalar
+
+
+def _TupleReader(unpacker):
+    unpack_from = unpacker.unpack_from
+
+    def ReadTuple(data, offset, schema, path, extraState):
+        return unpack_from(data, offset)
+    return ReadTuple
+
+
+UnsignedIntFromBinaryString = _ScalarReader(uint32)
+SignedIntFromBinaryString = _ScalarReader(int32)
+SingleFloatFromBinaryString = _ScalarReader(cfloat)
+DoubleFloatFromBinaryString = _ScalarReader(cdouble)
+
+_vectorReaders = {
+    ('vector2', False): _TupleReader(vector2_float),
+    ('vector2', True): _TupleReader(vector2_double),
+    ('vector3', False): _TupleReader(vector3_float),
+    ('vector3', True): _TupleReader(vector3_double),
+    ('vector4', False): _TupleReader(vector4_float),
+    ('vector4', True): _TupleReader(vector4_double),
+}
+
+
+def SpecializeFactory(schema, factory):
+    """对分支只取决于 schema 的基础类型，预先选出专用的读取函数"""
+    doublePrecision = schema.get('precision', 'single') == 'double'
+    if factory is IntFromBinaryString:
+        return UnsignedIntFromBinaryString if IsUnsignedIntSchema(schema) else SignedIntFromBinaryString
+    if factory is FloatFromBinaryString:
+        return DoubleFloatFromBinaryString if doublePrecision else SingleFloatFromBinaryString
+    if factory in (Vector2FromBinaryString, Vector3FromBinaryString, Vector4FromBinaryString):
+        if 'aliases' not in schema:
+            return _vectorReaders[(schema['type'], doublePrecision)]
+    return factory
+
+
 def UnionFromBinaryString(data, offset, schema, path, extraState):
     typeIndex = uint32.unpack_from(data, offset)[0]
     return extraState.RepresentSchemaNode(data, offset + 4, path, schema['optionTypes'][typeIndex])
@@ -211,6 +284,8 @@ def UnionFromBinaryString(data, offset, schema, path, extraState):
 # ============================================================================
 
 class FixedSizeListIterator(object):
+    __slots__ = ('data', 'offset', 'itemSchema', 'count', 'itemSize', 'index', '__path__', '__extraState__')
+
     def __init__(self, data, offset, itemSchema, itemCount, path, itemSize, extraState):
         self.data = data
         self.offset = offset
@@ -230,7 +305,7 @@ class FixedSizeListIterator(object):
             raise StopIteration()
         return self.__extraState__.RepresentSchemaNode(
             self.data, self.offset + self.itemSize * self.index,
-            FsdDataPathObject('[%s]' % str(self.index), parent=self.__path__),
+            ChildPath(self.__extraState__, self.__path__, '[%s]', self.index),
             self.itemSchema
         )
 
@@ -239,6 +314,8 @@ class FixedSizeListIterator(object):
 
 
 class FixedSizeListRepresentation(object):
+    __slots__ = ('data', 'offset', 'itemSchema', 'count', 'fixedLength', 'itemSize', '__path__', '__extraState__')
+
     def __init__(self, data, offset, itemSchema, path, extraState, knownLength=None):
         self.data = data
         self.offset = offset
@@ -272,12 +349,14 @@ class FixedSizeListRepresentation(object):
         totalOffset = self.offset + countOffset + self.itemSize * key
         return self.__extraState__.RepresentSchemaNode(
             self.data, totalOffset,
-            FsdDataPathObject('[%s]' % str(key), parent=self.__path__),
+            ChildPath(self.__extraState__, self.__path__, '[%s]', key),
             self.itemSchema
         )
 
 
 class VariableSizedListRepresentation(object):
+    __slots__ = ('data', 'offset', 'itemSchema', 'count', 'fixedLength', '__path__', '__extraState__')
+
     def __init__(self, data, offset, itemSchema, path, extraState, knownLength=None):
         self.data = data
         self.offset = offset
@@ -305,22 +384,123 @@ class VariableSizedListRepresentation(object):
         )[0]
         return self.__extraState__.RepresentSchemaNode(
             self.data, self.offset + dataOffsetFromObjectStart,
-            FsdDataPathObject('[%s]' % str(key), parent=self.__path__),
+            ChildPath(self.__extraState__, self.__path__, '[%s]', key),
             self.itemSchema
         )
 
 
+def GetBulkItemFormat(itemSchema):
+    """基础类型列表项的 struct 格式字符和分量数，用于整段解码；不适用时返回 None"""
+    if 'aliases' in itemSchema:
+        return None
+    itemType = itemSchema.get('type')
+    doublePrecision = itemSchema.get('precision', 'single') == 'double'
+    if itemType in ('int', 'typeID', 'localizationID'):
+        return ('I' if IsUnsignedIntSchema(itemSchema) else 'i', 1)
+    if itemType == 'float':
+        return ('d' if doublePrecision else 'f', 1)
+    if itemType in ('vector2', 'vector3', 'vector4'):
+        return ('d' if doublePrecision else 'f', int(itemType[-1]))
+    return None
+
+
+def PrepareRecordSchema(schema):
+    """定长且只含基础类型属性的对象，预先拼出整条记录的 Struct；不适用时返回 None"""
+    if schema.get('type') != 'object' or 'size' not in schema:
+        return None
+    constantAttributeOffsets = schema.get('constantAttributeOffsets', {})
+    fields = []
+    for key, attributeSchema in schema['attributes'].items():
+        bulkFormat = GetBulkItemFormat(attributeSchema)
+        if key not in constantAttributeOffsets or bulkFormat is None:
+            return None
+        fields.append((constantAttributeOffsets[key], key, bulkFormat))
+    if not fields:
+        return None
+    fields.sort()
+    # '=' 表示不做对齐填充，属性之间的空隙用 'x' 显式跳过
+    recordFormat = '='
+    position = 0
+    valueIndex = 0
+    recordFields = {}
+    for attributeOffset, key, (formatChar, width) in fields:
+        if attributeOffset < position:
+            return None
+        fieldFormat = '%d%s' % (width, formatChar)
+        recordFormat += '%dx%s' % (attributeOffset - position, fieldFormat)
+        position = attributeOffset + struct.calcsize('=' + fieldFormat)
+        recordFields[key] = (valueIndex, width)
+        valueIndex += width
+    if position > schema['size']:
+        return None
+    recordFormat += '%dx' % (schema['size'] - position)
+    schema['_recordFields'] = recordFields
+    return struct.Struct(recordFormat)
+
+
+class FixedSizeRecordObject(object):
+    """整条解码出来的定长对象，接口与 ObjectLoader 相同"""
+    __slots__ = ('__values__', '__schema__', '__path__')
+
+    def __init__(self, values, schema, path):
+        self.__values__ = values
+        self.__schema__ = schema
+        self.__path__ = path
+
+    def __repr__(self):
+        return '<FSD Object: %s >' % self.__path__
+
+    def __getitem__(self, key):
+        field = self.__schema__['_recordFields'].get(key)
+        if field is None:
+            raise KeyError("Object: %s - Attribute '%s' is not in the schema" % (self.__path__, key))
+        valueIndex, width = field
+        if width == 1:
+            return self.__values__[valueIndex]
+        return self.__values__[valueIndex:valueIndex + width]
+
+    def __getattr__(self, name):
+        try:
+            return self.__getitem__(name)
+        except KeyError as e:
+            raise AttributeError(str(e))
+
+
 def ListFromBinaryString(data, offset, schema, path, extraState, knownLength=None):
     knownLength = schema.get('length', knownLength)
+    itemSchema = schema['itemTypes']
+    if knownLength is None:
+        count = uint32.unpack_from(data, offset)[0]
+        itemsOffset = offset + 4
+    else:
+        count = knownLength
+        itemsOffset = offset
+    recordStruct = schema.get('_recordStruct')
+    if recordStruct is not None:
+        # 定长基础类型对象列表：一次 iter_unpack 解出所有记录
+        records = data[itemsOffset:itemsOffset + count * recordStruct.size]
+        return [FixedSizeRecordObject(values, itemSchema, path) for values in recordStruct.iter_unpack(records)]
+    bulkFormat = schema.get('_bulkFormat')
+    if bulkFormat is not None:
+        # 基础类型定长列表：一次 unpack 整段数据，不再逐项分派
+        formatChar, width = bulkFormat
+        values = struct.unpack_from('%d%s' % (count * width, formatChar), data, itemsOffset)
+        if width == 1:
+            return list(values)
+        return list(zip(*[iter(values)] * width))
+    # 其余列表直接按偏移逐项构造，不经过 FixedSizeListIterator 的迭代器协议
     if 'fixedItemSize' in schema:
-        listLikeObject = FixedSizeListRepresentation(
-            data, offset, schema['itemTypes'], path, extraState, knownLength
-        )
+        itemSize = itemSchema['size']
+        itemOffsets = range(itemsOffset, itemsOffset + itemSize * count, itemSize)
     else:
-        listLikeObject = VariableSizedListRepresentation(
-            data, offset, schema['itemTypes'], path, extraState, knownLength
-        )
-    return list(listLikeObject)
+        # 列表长度各不相同，不走按属性个数缓存的 Struct
+        itemOffsets = [offset + itemOffset
+                       for itemOffset in struct.unpack_from('%dI' % count, data, itemsOffset)]
+    represent = extraState.RepresentSchemaNode
+    if extraState.tracePaths:
+        return [represent(data, itemOffset, ChildPath(extraState, path, '[%s]', i), itemSchema)
+                for i, itemOffset in enumerate(itemOffsets)]
+    return [represent(data, itemOffset, path, itemSchema) for itemOffset in itemOffsets]
 
 
 # ============================================================================
@@ -331,47 +511,32 @@ class StandardFSDOptimizedDictFooter(object):
     def __init__(self, data, schema):
         self.data = data
         if 'size' in schema['keyFooter']['itemTypes']['attributes']:
-            self.unpacker = keyedOffsetDataWithSize
+            fieldCount = 3
             self.offsetDataHasSizeAttribute = True
         else:
-            self.unpacker = keyedOffsetData
+            fieldCount = 2
             self.offsetDataHasSizeAttribute = False
-        self.listItemSize = self.unpacker.size
-        self.startingOffset = 4
         self.size = readIntFromBinaryStringAtOffset(data, 0)
+        # 一次解出整个 footer，按列拆成有序的 key / offset / size 序列
+        fields = struct.unpack_from('%di' % (self.size * fieldCount), data, 4)
+        self.keys = fields[0::fieldCount]
+        self.offsets = fields[1::fieldCount]
+        if self.offsetDataHasSizeAttribute:
+            self.sizes = fields[2::fieldCount]
+        else:
+            self.sizes = (0,) * self.size
 
     def Get(self, key):
-        minIndex = 0
-        maxIndex = self.size - 1
-        while 1:
-            if maxIndex < minIndex:
-                return None
-            meanIndex = (minIndex + maxIndex) / 2
-            currentObjectOffset = meanIndex * self.listItemSize + self.startingOffset
-            currentKey, offset, size = self.__unpackFromOffset__(currentObjectOffset)
-            if currentKey < key:
-                minIndex = meanIndex + 1
-            elif currentKey > key:
-                maxIndex = meanIndex - 1
-            else:
-                return (offset, size)
+        index = bisect.bisect_left(self.keys, key)
+        if index < self.size and self.keys[index] == key:
+            return (self.offsets[index], self.sizes[index])
+        return None
 
     def __len__(self):
         return self.size
 
-    def __unpackFromOffset__(self, currentObjectOffset):
-        if self.offsetDataHasSizeAttribute:
-            currentKey, offset, size = self.unpacker.unpack_from(self.data, currentObjectOffset)
-        else:
-            currentKey, offset = self.unpacker.unpack_from(self.data, currentObjectOffset)
-            size = 0
-        return (currentKey, offset, size)
-
     def items(self):  # Python 3: items() instead of iteritems()
-        for i in range(0, self.size):
-            currentObjectOffset = i * self.listItemSize + self.startingOffset
-            currentKey, offset, size = self.__unpackFromOffset__(currentObjectOffset)
-            yield (currentKey, (offset, size))
+        return zip(self.keys, zip(self.offsets, self.sizes))
 
     def iteritems(self):  # Keep for backward compatibility
         return self.items()
@@ -381,21 +546,15 @@ class StandardFSDDictFooter(object):
     def __init__(self, data, offset, schema, path, extraState):
         self.footerData = extraState.factories['list'](data, offset, schema, path, extraState)
         self.size = len(self.footerData)
+        # 预先取出所有 key，Get 时直接用 bisect 二分，不再逐次读取对象属性
+        self._keys = [item['key'] for item in self.footerData]
 
     def Get(self, key):
-        minIndex = 0
-        maxIndex = self.size - 1
-        while 1:
-            if maxIndex < minIndex:
-                return None
-            meanIndex = (minIndex + maxIndex) / 2
-            item = self.footerData[meanIndex]
-            if item['key'] < key:
-                minIndex = meanIndex + 1
-            elif item['key'] > key:
-                maxIndex = meanIndex - 1
-            else:
-                return (item['offset'], getattr(item, 'size', 0))
+        i = bisect.bisect_left(self._keys, key)
+        if i < self.size and self._keys[i] == key:
+            item = self.footerData[i]
+            return (item['offset'], getattr(item, 'size', 0))
+        return None
 
     def __len__(self):
         return self.size
@@ -410,12 +569,11 @@ class StandardFSDDictFooter(object):
 
 def CreatePythonDictOffset(schema, binaryFooterData, path, extraState):
     useOptimizedPythonOffsetStructure = schema['keyTypes']['type'] == 'int'
-    buff = ctypes.create_string_buffer(binaryFooterData, len(binaryFooterData))
     if useOptimizedPythonOffsetStructure:
-        return StandardFSDOptimizedDictFooter(buff, schema)
+        return StandardFSDOptimizedDictFooter(binaryFooterData, schema)
     else:
-        return StandardFSDDictFooter(buff, 0, schema['keyFooter'], FsdDataPathObject('<keyFooter>', parent=path),
-                                     extraState)
+        return StandardFSDDictFooter(binaryFooterData, 0, schema['keyFooter'],
+                                     FsdDataPathObject('<keyFooter>', parent=path), extraState)
 
 
 def CreateDictFooter(schema, binaryFooterData, path, extraState):
@@ -423,6 +581,9 @@ def CreateDictFooter(schema, binaryFooterData, path, extraState):
 
 
 class DictLoader(object):
+    __slots__ = ('data', 'offset', 'schema', 'sizeOfData', 'sizeOfFooter', 'index', 'footer',
+                 '__path__', '__extraState__')
+
     def __init__(self, data, offset, schema, path, extraState):
         self.data = data
         self.offset = offset
@@ -446,7 +607,7 @@ class DictLoader(object):
     def __GetItemFromOffset__(self, key, offset):
         return self.__extraState__.RepresentSchemaNode(
             self.data, self.offset + 4 + offset,
-            FsdDataPathObject('[%s]' % str(key), parent=self.__path__),
+            ChildPath(self.__extraState__, self.__path__, '[%s]', key),
             self.schema['valueTypes']
         )
 
@@ -454,21 +615,20 @@ class DictLoader(object):
         return len(self.footer)
 
     def __contains__(self, item):
+        # 成员测试直接查 footer，不写入 index 缓存
         try:
-            x = self._Search(item)
-            return x is not None
+            return self.footer.Get(item) is not None
         except TypeError:
             return False
 
     def _Search(self, key):
-        if key not in self.index:
+        # 只缓存命中的结果，未命中的 key 不占用 index
+        searchResult = self.index.get(key)
+        if searchResult is None:
             searchResult = self.footer.Get(key)
             if searchResult is not None:
                 self.index[key] = searchResult
-            else:
-                self.index[key] = None
-            return searchResult
-        return self.index[key]
+        return searchResult
 
     def Get(self, key):
         return self.__getitem__(key)
@@ -512,7 +672,31 @@ class DictLoader(object):
 # 对象加载器
 # ============================================================================
 
+_offsetTableStructs = {}
+_missingDefault = object()
+
+
+def PrepareObjectSchema(schema):
+    """把每个属性的 (子 schema, 固定偏移或 None, 默认值) 合并到一张表里，__getitem__ 只需查一次"""
+    constantAttributeOffsets = schema.get('constantAttributeOffsets', {})
+    schema['_attrInfo'] = dict(
+        (key, (attributeSchema, constantAttributeOffsets.get(key), attributeSchema.get('default', _missingDefault)))
+        for key, attributeSchema in schema['attributes'].items()
+    )
+
+
+def GetOffsetTableStruct(count):
+    """按属性个数缓存 uint32 偏移表的 Struct"""
+    offsetTableStruct = _offsetTableStructs.get(count)
+    if offsetTableStruct is None:
+        offsetTableStruct = _offsetTableStructs[count] = struct.Struct('%dI' % count)
+    return offsetTableStruct
+
+
 class ObjectLoader(object):
+    __slots__ = ('__data__', '__offset__', '__schema__', '__extraState__', '__path__', '__hasOptionalAttributes__',
+                 '__offsetAttributesOffsetLookupTable__', '__variableDataOffsetBase__')
+
     def __init__(self, data, offset, schema, path, extraState):
         self.__data__ = data
         self.__offset__ = offset
@@ -532,37 +716,35 @@ class ObjectLoader(object):
                             __offsetAttributes__.remove(attr)
 
             offsetAttributeArrayStart = offset + schema.get('endOfFixedSizeData', 0) + 8
-            offsetAttributeOffsetsType = ctypes.c_uint32 * len(__offsetAttributes__)
-            self.__variableDataOffsetBase__ = offsetAttributeArrayStart + ctypes.sizeof(offsetAttributeOffsetsType)
-            offsetData = data[offsetAttributeArrayStart:offsetAttributeArrayStart + ctypes.sizeof(
-                offsetAttributeOffsetsType)]
-            offsetTable = array.array('I', offsetData).tolist()
-            for k, v in zip(__offsetAttributes__, offsetTable):
-                self.__offsetAttributesOffsetLookupTable__[k] = v
+            offsetAttributeCount = len(__offsetAttributes__)
+            self.__variableDataOffsetBase__ = offsetAttributeArrayStart + 4 * offsetAttributeCount
+            offsetTable = GetOffsetTableStruct(offsetAttributeCount).unpack_from(data, offsetAttributeArrayStart)
+            self.__offsetAttributesOffsetLookupTable__ = dict(zip(__offsetAttributes__, offsetTable))
 
     def __repr__(self):
         return '<FSD Object: %s >' % self.__path__
 
     def __getitem__(self, key):
-        if key not in self.__schema__['attributes']:
+        attributeInfo = self.__schema__['_attrInfo'].get(key)
+        if attributeInfo is None:
             raise KeyError("Object: %s - Attribute '%s' is not in the schema" % (self.__path__, key))
-        attributeSchema = self.__schema__['attributes'][key]
-        if key in self.__schema__['constantAttributeOffsets']:
+        attributeSchema, constantOffset, default = attributeInfo
+        if constantOffset is not None:
             return self.__extraState__.RepresentSchemaNode(
-                self.__data__, self.__offset__ + self.__schema__['constantAttributeOffsets'][key],
-                FsdDataPathObject('.%s' % str(key), parent=self.__path__),
-                attributeSchema
-            )
-        else:
-            if key not in self.__offsetAttributesOffsetLookupTable__:
-                if 'default' in attributeSchema:
-                    return attributeSchema['default']
-                raise KeyError("Object: %s - Attribute '%s' is not present" % (self.__path__, key))
-            return self.__extraState__.RepresentSchemaNode(
-                self.__data__, self.__variableDataOffsetBase__ + self.__offsetAttributesOffsetLookupTable__[key],
-                FsdDataPathObject('.%s' % str(key), parent=self.__path__),
+                self.__data__, self.__offset__ + constantOffset,
+                ChildPath(self.__extraState__, self.__path__, '.%s', key),
                 attributeSchema
             )
+        variableOffset = self.__offsetAttributesOffsetLookupTable__.get(key)
+        if variableOffset is None:
+            if default is not _missingDefault:
+                return default
+            raise KeyError("Object: %s - Attribute '%s' is not present" % (self.__path__, key))
+        return self.__extraState__.RepresentSchemaNode(
+            self.__data__, self.__variableDataOffsetBase__ + variableOffset,
+            ChildPath(self.__extraState__, self.__path__, '.%s', key),
+            attributeSchema
+        )
 
     def __getattr__(self, name):
         try:
@@ -595,27 +777,58 @@ defaultLoaderFactories = {
 }
 
 
+def _UnsupportedSchemaTypeFactory(schemaType):
+    def Unsupported(data, offset, schema, path, extraState):
+        raise NotImplementedError("Unknown type not supported in binary loader '%s'" % str(schemaType))
+    return Unsupported
+
+
+def PrepareSchema(schema, factories):
+    """一次性遍历 schema，把对应的工厂函数挂到每个节点的 '_factory' 上，避免逐节点查表"""
+    visited = set()
+    pending = [schema]
+    while pending:
+        node = pending.pop()
+        if not isinstance(node, dict) or id(node) in visited:
+            continue
+        visited.add(id(node))
+        schemaType = node.get('type')
+        if schemaType in factories:
+            node['_factory'] = SpecializeFactory(node, factories[schemaType])
+        else:
+            node['_factory'] = _UnsupportedSchemaTypeFactory(schemaType)
+        if schemaType == 'object':
+            PrepareObjectSchema(node)
+        elif schemaType == 'enum':
+            PrepareEnumSchema(node)
+        elif schemaType == 'list' and 'fixedItemSize' in node:
+            node['_bulkFormat'] = GetBulkItemFormat(node['itemTypes'])
+            node['_recordStruct'] = PrepareRecordSchema(node['itemTypes'])
+        for childKey in ('itemTypes', 'valueTypes', 'keyTypes', 'keyFooter'):
+            if childKey in node:
+                pending.append(node[childKey])
+        pending.extend(node.get('attributes', {}).values())
+        pending.extend(node.get('optionTypes', ()))
+    return schema
+
+
 class LoaderState(object):
-    def __init__(self, factories, logger=None, cfgObject=None):
+    def __init__(self, factories, logger=None, cfgObject=None, tracePaths=False):
         self.factories = factories
+        # 调试时打开，错误信息中会带上完整的节点路径（每个节点多一次对象分配）
+        self.tracePaths = tracePaths
 
     def RepresentSchemaNode(self, data, offset, path, schemaNode):
-        schemaType = schemaNode.get('type')
-        if schemaType in self.factories:
-            return self.factories[schemaType](data, offset, schemaNode, path, self)
-        raise NotImplementedError("Unknown type not supported in binary loader '%s'" % str(schemaType))
+        return schemaNode['_factory'](data, offset, schemaNode, path, self)
 
     def FormatSize(self, size):
         return sizeof_fmt(size)
 
 
 def RepresentSchemaNode(data, offset, schemaNode, path, extraState=None):
-    schemaType = schemaNode.get('type')
     if extraState is None:
         extraState = LoaderState(defaultLoaderFactories, None)
-    if schemaType in extraState.factories:
-        return extraState.factories[schemaType](data, offset, schemaNode, path, extraState)
-    raise NotImplementedError("Unknown type not supported in binary loader '%s'" % str(schemaType))
+    return schemaNode['_factory'](data, offset, schemaNode, path, extraState)
 
 
 # ============================================================================
@@ -628,15 +841,40 @@ def GetEmbeddedSchemaAndSizeFromFile(fileObject):
     return (cPickle.loads(pickledSchema), schemaSize)
 
 
+# 已准备好的 schema 缓存：以序列化 schema 的 blake2b 摘要为键，
+# 相同 schema 的文件重复加载时跳过 unpickle 和 PrepareSchema 遍历
+_PREPARED_SCHEMAS = collections.OrderedDict()
+_PREPARED_SCHEMAS_MAXSIZE = 64
+
+
+def GetPreparedSchema(pickledSchema, factories):
+    key = hashlib.blake2b(pickledSchema).digest()
+    cached = _PREPARED_SCHEMAS.get(key)
+    if cached is not None and cached[0] is factories:
+        _PREPARED_SCHEMAS.move_to_end(key)
+        return cached[1]
+    schema = PrepareSchema(cPickle.loads(pickledSchema), factories)
+    _PREPARED_SCHEMAS[key] = (factories, schema)
+    _PREPARED_SCHEMAS.move_to_end(key)
+    if len(_PREPARED_SCHEMAS) > _PREPARED_SCHEMAS_MAXSIZE:
+        _PREPARED_SCHEMAS.popitem(last=False)
+    return schema
+
+
 def LoadFromString(dataString, optimizedSchema=None, path=None, extraState=None):
     if path is None:
         path = FsdDataPathObject('<string input>')
+    if extraState is None:
+        extraState = LoaderState(defaultLoaderFactories, None)
     offsetToData = 0
     if optimizedSchema is None:
         schemaSize = uint32.unpack_from(dataString, 0)[0]
-        optimizedSchema = cPickle.loads(dataString[4:schemaSize + 4])
+        optimizedSchema = GetPreparedSchema(dataString[4:schemaSize + 4], extraState.factories)
         offsetToData = schemaSize + 4
-    dataBuffer = ctypes.create_string_buffer(dataString, len(dataString))
+    else:
+        PrepareSchema(optimizedSchema, extraState.factories)
+    # 直接在原始数据上解析；memoryview 让 footer 等切片不再复制数据
+    dataBuffer = memoryview(dataString)
     return RepresentSchemaNode(dataBuffer, offsetToData, optimizedSchema, path, extraState)
 
 
@@ -664,37 +902,80 @@ def LoadFSDDataInPython(dataResPath, schemaResPath=None, optimize=None, cacheSiz
         print('Loading FSD data from memory. %s' % sizeof_fmt(len(dataBytes)))
         return LoadFromString(dataBytes, schema, path=FsdDataPathObject('<memory data>'))
     else:
-        # 从文件加载（原有逻辑）
-        dataFile = open(dataResPath, 'rb')
-        if schema is None:
-            peekSchema, size = GetEmbeddedSchemaAndSizeFromFile(dataFile)
-            dataFile.seek(0)
-        else:
-            peekSchema = schema
+        # 从文件加载：映射由返回的加载器持有，最后一个引用释放时关闭；
+        # 需要及时关闭映射时改用 OpenFSDDataFile
+        s = MapFSDDataFile(dataResPath)
+        print('Loading FSD data file %s into memory. %s' % (dataResPath, sizeof_fmt(len(s))))
+        return LoadFromString(s, schema, path=FsdDataPathObject('<file %s>' % dataResPath))
+
+
+def MapFSDDataFile(dataResPath):
+    """只读映射整个 FSD 数据文件，按需换页，不再整体读入内存"""
+    with open(dataResPath, 'rb') as dataFile:
+        # 空文件无法映射，也没有内嵌 schema
+        if os.fstat(dataFile.fileno()).st_size == 0:
+            raise ValueError('FSD 数据文件为空: %s' % dataResPath)
+        peekSchema, size = GetEmbeddedSchemaAndSizeFromFile(dataFile)
         if peekSchema['type'] == 'dict' and peekSchema.get('buildIndex', False):
             # 对于索引字典，我们需要使用 IndexLoader，但为了简化，我们直接加载全部
             # 实际使用中，如果文件很大，可能需要实现 IndexLoader
             pass
-        s = dataFile.read()
-        print('Loading FSD data file %s into memory. %s' % (dataResPath, sizeof_fmt(len(s))))
-        dataFile.close()
-        return LoadFromString(s, schema, path=FsdDataPathObject('<file %s>' % dataResPath))
+        # 关闭文件对象后映射仍然有效
+        return mmap.mmap(dataFile.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+@contextmanager
+def OpenFSDDataFile(dataResPath):
+    """
+    加载 FSD 数据文件，退出 with 块时关闭内存映射
+
+    加载出的对象只在 with 块内有效，需要保留的数据应先转换（如 fsd_to_dict）。
+    """
+    mapping = MapFSDDataFile(dataResPath)
+    try:
+        print('Loading FSD data file %s into memory. %s' % (dataResPath, sizeof_fmt(len(mapping))))
+        yield LoadFromString(mapping, None, path=FsdDataPathObject('<file %s>' % dataResPath))
+    finally:
+        try:
+            mapping.close()
+        except BufferError:
+            # 调用方仍持有加载对象（例如异常回溯中的引用），映射随最后一个引用释放
+            pass
 
 
 # ============================================================================
 # FSD 对象转字典
 # ============================================================================
 
-def fsd_to_dict(obj, visited=None):
-    """递归将 FSD 对象转换为 Python 字典"""
-    if visited is None:
-        visited = set()
+def _fsd_text(obj):
+    """将 FSD 中的 str / bytes 值规范化为字符串"""
+    if isinstance(obj, bytes):
+        # 尝试解码为字符串
+        try:
+            return obj.decode('utf-8', errors='ignore')
+        except:
+            return str(obj)
+    # 如果已经是字符串，检查是否有 b'...' 这样的表示
+    s = str(obj)
+    # 如果字符串看起来像是 bytes 的 repr，尝试提取实际内容
+    if s.startswith("b'") and s.endswith("'") or s.startswith('b"') and s.endswith('"'):
+        # 提取引号内的内容
+        content = s[2:-1]
+        # 处理转义字符
+        try:
+            return content.encode('latin-1').decode('unicode_escape').encode('latin-1').decode('utf-8',
+                                                                                               errors='ignore')
+        except:
+            return content
+    return s
+
 
-    obj_id = id(obj)
-    if obj_id in visited:
-        return "<circular reference>"
-    visited.add(obj_id)
+def fsd_to_dict(obj):
+    """递归将 FSD 对象转换为 Python 字典
 
+    FSD 数据直接从只读的二进制内容解析而来，天然无环，不需要做循环引用检测；
+    异常深的嵌套由解释器的递归上限兜底。
+    """
     try:
         # 处理字典类型（DictLoader）
         if hasattr(obj, 'items') or hasattr(obj, 'iteritems'):
@@ -709,17 +990,15 @@ def fsd_to_dict(obj, visited=None):
                         key = key.decode('utf-8', errors='ignore')
                     elif not isinstance(key, (int, str)):
                         key = str(key)
-                    result[str(key)] = fsd_to_dict(value, visited)
+                    result[str(key)] = fsd_to_dict(value)
             except (TypeError, AttributeError):
                 pass
-            visited.remove(obj_id)
             return result
 
         # 处理列表类型
         if hasattr(obj, '__iter__') and not isinstance(obj, (str, bytes)):
             try:
-                result = [fsd_to_dict(item, visited) for item in obj]
-                visited.remove(obj_id)
+                result = [fsd_to_dict(item) for item in obj]
                 return result
             except (TypeError, AttributeError):
                 pass
@@ -735,54 +1014,30 @@ def fsd_to_dict(obj, visited=None):
                         for attr_name in schema_attrs.keys():
                             try:
                                 value = obj[attr_name]
-                                result[attr_name] = fsd_to_dict(value, visited)
+                                result[attr_name] = fsd_to_dict(value)
                             except (KeyError, AttributeError, TypeError):
                                 attr_schema = schema_attrs.get(attr_name, {})
                                 if 'default' in attr_schema:
-                                    result[attr_name] = fsd_to_dict(attr_schema['default'], visited)
+                                    result[attr_name] = fsd_to_dict(attr_schema['default'])
             except (AttributeError, TypeError):
                 pass
-            visited.remove(obj_id)
             return result if result else str(obj)
 
         # 处理基本类型
         if isinstance(obj, (int, float, bool, type(None))):  # Python 3: no long type
-            visited.remove(obj_id)
             return obj
 
         if isinstance(obj, (str, bytes)):  # Python 3: str is unicode, bytes is binary
-            visited.remove(obj_id)
-            if isinstance(obj, bytes):
-                # 尝试解码为字符串
-                try:
-                    return obj.decode('utf-8', errors='ignore')
-                except:
-                    return str(obj)
-            # 如果已经是字符串，检查是否有 b'...' 这样的表示
-            s = str(obj)
-            # 如果字符串看起来像是 bytes 的 repr，尝试提取实际内容
-            if s.startswith("b'") and s.endswith("'") or s.startswith('b"') and s.endswith('"'):
-                # 提取引号内的内容
-                content = s[2:-1]
-                # 处理转义字符
-                try:
-                    return content.encode('latin-1').decode('unicode_escape').encode('latin-1').decode('utf-8',
-                                                                                                       errors='ignore')
-                except:
-                    return content
-            return s
+            return _fsd_text(obj)
 
         # 处理元组（转换为列表以便 JSON 序列化）
         if isinstance(obj, tuple):
-            result = [fsd_to_dict(item, visited) for item in obj]
-            visited.remove(obj_id)
+            result = [fsd_to_dict(item) for item in obj]
             return result
 
-        visited.remove(obj_id)
         return str(obj)
 
     except Exception as e:
-        visited.discard(obj_id)
         return "<error: %s>" % str(e)
 
 
@@ -795,7 +1050,7 @@ def _get_build_info():
     try:
         print("[+] 获取EVE客户端构建信息...")
         url = "https://binaries.eveonline.com/eveclient_TQ.json"
-        response = get(url, timeout=30, verify=False)
+        response = get(url, timeout=30, verify=True)
         build_info = response.json()
         print("[+] 当前构建版本: %s" % build_info.get('build'))
         return build_info
@@ -819,7 +1074,7 @@ def _get_resfile_index_content():
         
         # 下载 installer 文件
         installer_url = "https://binaries.eveonline.com/eveonline_%s.txt" % build_number
-        response = get(installer_url, timeout=30, verify=False)
+        response = get(installer_url, timeout=30, verify=True)
         installer_content = response.text
         
         # 解析installer文件找到resfileindex
@@ -838,7 +1093,7 @@ def _get_resfile_index_content():
         
         # 下载resfileindex文件内容
         resfile_url = "https://binaries.eveonline.com/%s" % resfileindex_path
-        response = get(resfile_url, timeout=60, verify=False)
+        response = get(resfile_url, timeout=60, verify=True)
         resfile_content = response.text
         
         print("[+] resfileindex获取完成")
@@ -851,24 +1106,33 @@ def _get_resfile_index_content():
         return None
 
 
+# brackets 相关文件在 resfileindex 中的资源路径
+_BRACKETS_RES_PATHS = {
+    'brackets': 'res:/staticdata/brackets.static',
+    'bracketsByCategory': 'res:/staticdata/bracketsbycategory.static',
+    'bracketsByGroup': 'res:/staticdata/bracketsbygroup.static',
+    'bracketsByType': 'res:/staticdata/bracketsbytype.static'
+}
+
+# resfileindex 每行格式: 资源路径,文件路径,哈希,...
+# 只匹配以上四个资源路径开头的行，一次扫描即可找到全部目标，不必为整个索引建字典
+_BRACKETS_LINE_RE = re.compile(
+    r'^(%s),([^,\n]+),([^,\n]+)' % '|'.join(re.escape(res_path) for res_path in _BRACKETS_RES_PATHS.values()),
+    re.MULTILINE)
+
+
 def _parse_brackets_files_from_resfileindex(resfile_content):
     """从resfileindex内容中解析brackets文件的路径信息"""
-    brackets_files = {
-        'brackets': 'res:/staticdata/brackets.static',
-        'bracketsByCategory': 'res:/staticdata/bracketsbycategory.static',
-        'bracketsByGroup': 'res:/staticdata/bracketsbygroup.static',
-        'bracketsByType': 'res:/staticdata/bracketsbytype.static'
-    }
+    found = {}
+    for match in _BRACKETS_LINE_RE.finditer(resfile_content):
+        found.setdefault(match.group(1), (match.group(2), match.group(3)))
     
     result = {}
     
-    for name, res_path in brackets_files.items():
-        # 在resfileindex中查找对应的行
-        pattern = re.escape(res_path) + r',([^,]+),([^,]+)'
-        match = re.search(pattern, resfile_content)
-        if match:
-            file_path = match.group(1)
-            file_hash = match.group(2)
+    for name, res_path in _BRACKETS_RES_PATHS.items():
+        entry = found.get(res_path)
+        if entry:
+            file_path, file_hash = entry
             result[name] = {
                 'res_path': res_path,
                 'file_path': file_path,
@@ -887,7 +1151,7 @@ def _download_static_file(file_path):
         download_url = "https://resources.eveonline.com/%s" % file_path
         print("[+] 开始下载: %s" % download_url)
         
-        response = get(download_url, timeout=60, verify=False)
+        response = get(download_url, timeout=60, verify=True)
         file_data = response.content
         
         print("[+] 下载完成，大小: %s" % sizeof_fmt(len(file_data)))
@@ -900,6 +1164,47 @@ def _download_static_file(file_path):
         return None
 
 
+async def _fetch_static_file(session, file_path, retry_count=5, retry_delay=3.0):
+    """异步下载单个static文件，带重试"""
+    download_url = "https://resources.eveonline.com/%s" % file_path
+    print("[+] 开始下载: %s" % download_url)
+    for attempt in range(retry_count):
+        try:
+            async with session.get(download_url) as response:
+                response.raise_for_status()
+                file_data = await response.read()
+            print("[+] 下载完成 %s，大小: %s" % (file_path, sizeof_fmt(len(file_data))))
+            return file_data
+        except Exception as e:
+            if attempt < retry_count - 1:
+                print("[-] 下载失败 (尝试 %d/%d): %s - %s" % (attempt + 1, retry_count, file_path, str(e)))
+                await asyncio.sleep(retry_delay)
+            else:
+                print("[x] 下载文件失败 %s: %s" % (file_path, str(e)))
+    return None
+
+
+async def _fetch_static_files(file_paths):
+    """在同一个会话中并发下载多个static文件，返回 {file_path: bytes 或 None}"""
+    connector = aiohttp.TCPConnector(limit=8)
+    # 与同步下载的 timeout=60 含义相同：限制连接和每次读取，而不是整个下载（排队等待连接也计入 total）
+    timeout = aiohttp.ClientTimeout(total=None, sock_connect=60, sock_read=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        tasks = [_fetch_static_file(session, file_path) for file_path in file_paths]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+    return {file_path: (None if isinstance(data, BaseException) else data)
+            for file_path, data in zip(file_paths, results)}
+
+
+def _download_static_files(file_paths):
+    """下载多个static文件：有 aiohttp 时并发下载，否则逐个同步下载"""
+    if not file_paths:
+        return {}
+    if aiohttp is None:
+        return {file_path: _download_static_file(file_path) for file_path in file_paths}
+    return asyncio.run(_fetch_static_files(file_paths))
+
+
 def download_and_parse_brackets_files(use_cache=True):
     """从在线服务器下载并解析brackets文件"""
     print("\n" + "=" * 60)
@@ -918,50 +1223,51 @@ def download_and_parse_brackets_files(use_cache=True):
     
     result = {}
     
-    # 创建临时目录用于缓存（可选）
-    cache_dir = None
+    # 创建临时目录用于缓存（可选），并预先算好每个文件的缓存路径
+    cache_paths = {}
     if use_cache:
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        cache_dir = os.path.join(script_dir, 'raw')
-        os.makedirs(cache_dir, exist_ok=True)
+        cache_dir = Path(__file__).resolve().parent / 'raw'
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        cache_paths = {name: cache_dir / Path(info['file_path']).name for name, info in brackets_info.items()}
     
     print("\n开始下载和解析 brackets 文件...")
     print("=" * 60)
     
+    # 先读取缓存，再把缓存缺失的文件一次性并发下载
+    files_data = {}
+    for name, cache_file in cache_paths.items():
+        if cache_file.exists():
+            print("[+] 使用缓存文件: %s" % cache_file)
+            try:
+                files_data[name] = cache_file.read_bytes()
+            except Exception as e:
+                print("[!] 读取缓存文件失败: %s" % str(e))
+
+    missing = [name for name in brackets_info if name not in files_data]
+    downloaded = _download_static_files([brackets_info[name]['file_path'] for name in missing])
+    for name in missing:
+        file_path = brackets_info[name]['file_path']
+        file_data = downloaded.get(file_path)
+        if file_data is None:
+            continue
+        files_data[name] = file_data
+
+        # 保存到缓存
+        cache_file = cache_paths.get(name)
+        if cache_file is not None:
+            try:
+                cache_file.write_bytes(file_data)
+                print("[+] 已保存到缓存: %s" % cache_file)
+            except Exception as e:
+                print("[!] 保存缓存失败: %s" % str(e))
+
     for name, file_info in brackets_info.items():
         print("\n正在处理: %s" % name)
-        file_path = file_info['file_path']
-        file_hash = file_info['hash']
-        
-        # 检查缓存
-        file_data = None
-        if use_cache and cache_dir:
-            cache_file = os.path.join(cache_dir, os.path.basename(file_path))
-            if os.path.exists(cache_file):
-                print("[+] 使用缓存文件: %s" % cache_file)
-                try:
-                    with open(cache_file, 'rb') as f:
-                        file_data = f.read()
-                except Exception as e:
-                    print("[!] 读取缓存文件失败: %s" % str(e))
-        
-        # 如果缓存不存在，则下载
+        file_data = files_data.get(name)
         if file_data is None:
-            file_data = _download_static_file(file_path)
-            if file_data is None:
-                result[name] = {"error": "下载失败: %s" % file_path}
-                continue
-            
-            # 保存到缓存
-            if use_cache and cache_dir:
-                cache_file = os.path.join(cache_dir, os.path.basename(file_path))
-                try:
-                    with open(cache_file, 'wb') as f:
-                        f.write(file_data)
-                    print("[+] 已保存到缓存: %s" % cache_file)
-                except Exception as e:
-                    print("[!] 保存缓存失败: %s" % str(e))
-        
+            result[name] = {"error": "下载失败: %s" % file_info['file_path']}
+            continue
+
         # 解析文件
         try:
             print("[+] 正在解析 %s..." % name)
@@ -1028,9 +1334,11 @@ def parse_brackets_files(staticdata_dir):
             continue
 
         try:
-            data = LoadFSDDataInPython(file_path, optimize=False)
-            print("正在转换为字典格式...")
-            dict_data = fsd_to_dict(data)
+            with OpenFSDDataFile(file_path) as data:
+                print("正在转换为字典格式...")
+                dict_data = fsd_to_dict(data)
+                # 释放对映射的引用，退出时才能关闭映射
+                del data
 
             if isinstance(dict_data, dict):
                 print("条目数量: %d" % len(dict_data))
@@ -1051,6 +1359,84 @@ def parse_brackets_files(staticdata_dir):
     return result
 
 
+def _decode_json_bytes(obj):
+    return obj.decode('utf-8', errors='ignore')
+
+
+# 按精确类型分派，一次字典查找代替逐个 isinstance
+_JSON_DEFAULT_DISPATCH = {
+    tuple: list,
+    set: list,
+    frozenset: list,
+    bytes: _decode_json_bytes,
+}
+
+
+def _json_default(obj):
+    """处理 JSON 无法直接序列化的对象"""
+    convert = _JSON_DEFAULT_DISPATCH.get(type(obj))
+    if convert is not None:
+        return convert(obj)
+    # 子类等少见情况再走 isinstance
+    if isinstance(obj, (tuple, set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return _decode_json_bytes(obj)
+    return str(obj)
+
+
+class FSDJSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        return _json_default(obj)
+
+
+def _indent_json_chunk(chunk, newline, nested_newline):
+    """把单独序列化的值整体缩进一级；JSON 字符串内的换行已被转义，可直接替换"""
+    return chunk.replace(newline, nested_newline)
+
+
+def write_json_output(data, output_file):
+    """写出 JSON 文件（indent=2，UTF-8）；优先使用 orjson，输出内容与标准库一致
+
+    顶层字典按键逐个序列化写出，内存峰值只取决于最大的单个值，而不是整个文档。
+    """
+    if not isinstance(data, dict) or not data:
+        if orjson is not None:
+            with open(output_file, 'wb') as f:
+                f.write(orjson.dumps(data, default=_json_default,
+                                     option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        else:
+            with open(output_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False, cls=FSDJSONEncoder)
+        return
+
+    if orjson is not None:
+        with open(output_file, 'wb') as f:
+            separator = b'{\n  '
+            for key, value in data.items():
+                f.write(separator)
+                f.write(json.dumps(str(key), ensure_ascii=False).encode('utf-8'))
+                f.write(b': ')
+                f.write(_indent_json_chunk(
+                    orjson.dumps(value, default=_json_default,
+                                 option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS),
+                    b'\n', b'\n  '))
+                separator = b',\n  '
+            f.write(b'\n}')
+    else:
+        encoder = FSDJSONEncoder(indent=2, ensure_ascii=False)
+        with open(output_file, 'w', encoding='utf-8') as f:
+            separator = '{\n  '
+            for key, value in data.items():
+                f.write(separator)
+                f.write(json.dumps(str(key), ensure_ascii=False))
+                f.write(': ')
+                for chunk in encoder.iterencode(value):
+                    f.write(_indent_json_chunk(chunk, '\n', '\n  '))
+                separator = ',\n  '
+            f.write('\n}')
+
+
 def main():
     """主函数"""
     print("=" * 60)
@@ -1132,66 +1518,64 @@ def main():
         print("优化数据结构，合并 name 信息...")
         
         # 优化数据结构：将 brackets 中的 name 合并到其他结构中
-        def enrich_with_bracket_name(mapping_dict, brackets_dict, mapping_name):
+        def build_bracket_name_index(brackets_dict):
+            """一次性建立 bracket ID -> name 索引；键全为整数字符串时额外建立 int 键索引"""
+            name_by_str = {key: bracket.get('name', '')
+                           for key, bracket in brackets_dict.items() if isinstance(bracket, dict)}
+            try:
+                name_by_int = {int(key): name for key, name in name_by_str.items()}
+            except (TypeError, ValueError):
+                name_by_int = None
+            return name_by_int, name_by_str
+
+        def enrich_with_bracket_name(mapping_dict, name_index, mapping_name):
             """将 bracket ID 映射转换为包含 name 的对象"""
             if not isinstance(mapping_dict, dict):
                 return mapping_dict
             
+            name_by_int, name_by_str = name_index
             optimized = {}
             for key, bracket_id in mapping_dict.items():
-                bracket_id_str = str(bracket_id)
-                if bracket_id_str in brackets_dict and isinstance(brackets_dict[bracket_id_str], dict):
-                    optimized[key] = {
-                        'bracketId': bracket_id,
-                        'name': brackets_dict[bracket_id_str].get('name', '')
-                    }
+                # bracket ID 通常是 int，直接查 int 索引，省去 str() 转换
+                if name_by_int is not None and type(bracket_id) is int:
+                    name = name_by_int.get(bracket_id, '')
                 else:
-                    optimized[key] = {
-                        'bracketId': bracket_id,
-                        'name': ''
-                    }
+                    name = name_by_str.get(str(bracket_id), '')
+                optimized[key] = {
+                    'bracketId': bracket_id,
+                    'name': name
+                }
             print("[+] 已优化 %s: %d 个条目" % (mapping_name, len(optimized)))
             return optimized
         
         if 'brackets' in all_data and isinstance(all_data['brackets'], dict):
-            brackets = all_data['brackets']
+            name_index = build_bracket_name_index(all_data['brackets'])
             
             # 处理 bracketsByType
             if 'bracketsByType' in all_data:
                 all_data['bracketsByType'] = enrich_with_bracket_name(
-                    all_data['bracketsByType'], brackets, 'bracketsByType'
+                    all_data['bracketsByType'], name_index, 'bracketsByType'
                 )
             
             # 处理 bracketsByGroup
             if 'bracketsByGroup' in all_data:
                 all_data['bracketsByGroup'] = enrich_with_bracket_name(
-                    all_data['bracketsByGroup'], brackets, 'bracketsByGroup'
+                    all_data['bracketsByGroup'], name_index, 'bracketsByGroup'
                 )
             
             # 处理 bracketsByCategory
             if 'bracketsByCategory' in all_data:
                 all_data['bracketsByCategory'] = enrich_with_bracket_name(
-                    all_data['bracketsByCategory'], brackets, 'bracketsByCategory'
+                    all_data['bracketsByCategory'], name_index, 'bracketsByCategory'
                 )
 
         print("\n" + "=" * 60)
         print("生成 JSON 输出...")
 
-        class FSDJSONEncoder(json.JSONEncoder):
-            def default(self, obj):
-                # Python 3: no long type (merged into int)
-                if isinstance(obj, (tuple, set, frozenset)):
-                    return list(obj)
-                if isinstance(obj, bytes):
-                    return obj.decode('utf-8', errors='ignore')
-                return super(FSDJSONEncoder, self).default(obj)
-
         # 使用脚本所在目录的绝对路径，确保文件生成在正确的位置
         script_dir = os.path.dirname(os.path.abspath(__file__))
         output_file = os.path.join(script_dir, 'brackets_output.json')
-        # Python 3: open() supports encoding parameter
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(all_data, f, indent=2, ensure_ascii=False, cls=FSDJSONEncoder, default=str)
+        write_json_output(all_data, output_file)
 
         print("✓ JSON 已保存到: %s" % output_file)
 
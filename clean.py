@@ -7,37 +7,44 @@
 
 import shutil
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 
+def _remove_path(path, remover, label=None):
+    """删除单个文件或目录，返回是否成功"""
+    label = label or path
+    try:
+        remover(path)
+        print(f"[+] 已删除: {label}")
+        return True
+    except Exception as e:
+        print(f"[!] 删除失败 {label}: {e}")
+        return False
+
+
 def clean_python_cache():
-    """使用os.walk清理Python缓存文件 - 更高效的方式"""
+    """使用os.walk收集Python缓存文件，再用线程池并行删除"""
     print("[+] 清理Python缓存文件...")
     
-    pyc_count = 0
-    pycache_count = 0
+    pycache_dirs = []
+    pyc_files = []
     
     for root, dirs, files in os.walk('.'):
-        # 删除__pycache__目录
+        # __pycache__目录整体删除，不再进入其中
         if '__pycache__' in dirs:
-            cache_path = os.path.join(root, '__pycache__')
-            try:
-                shutil.rmtree(cache_path)
-                pycache_count += 1
-                print(f"[+] 已删除: {cache_path}")
-            except Exception as e:
-                print(f"[!] 删除失败 {cache_path}: {e}")
+            dirs.remove('__pycache__')
+            pycache_dirs.append(os.path.join(root, '__pycache__'))
         
-        # 删除独立的.pyc文件
+        # 独立的.pyc文件
         for file in files:
             if file.endswith('.pyc'):
-                file_path = os.path.join(root, file)
-                try:
-                    os.remove(file_path)
-                    pyc_count += 1
-                    print(f"[+] 已删除: {file_path}")
-                except Exception as e:
-                    print(f"[!] 删除失败 {file_path}: {e}")
+                pyc_files.append(os.path.join(root, file))
+    
+    # 各个删除操作互不依赖，并行提交给内核
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        pycache_count = sum(executor.map(lambda path: _remove_path(path, shutil.rmtree), pycache_dirs))
+        pyc_count = sum(executor.map(lambda path: _remove_path(path, os.remove), pyc_files))
     
     print(f"[+] 共删除 {pyc_count} 个.pyc文件和 {pycache_count} 个__pycache__目录")
 
@@ -63,17 +70,17 @@ def clean_all():
     print("[+] 开始清理所有缓存和输出目录...")
     print("=" * 50)
     
+    existing_dirs = []
     for dir_name in cleanup_dirs:
         dir_path = project_root / dir_name
         if dir_path.exists():
-            try:
-                shutil.rmtree(dir_path)
-                print(f"[+] 已删除目录: {dir_name}")
-            except Exception as e:
-                print(f"[!] 删除目录失败 {dir_name}: {e}")
+            existing_dirs.append((dir_name, dir_path))
         else:
             print(f"[+] 目录不存在，跳过: {dir_name}")
     
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda item: _remove_path(item[1], shutil.rmtree, f"目录 {item[0]}"), existing_dirs))
+    
     print("=" * 50)
     print("[+] 清理完成！")
 
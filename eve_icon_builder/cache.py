@@ -4,35 +4,73 @@
 """
 
 import os
+import functools
 import hashlib
+import itertools
+import mmap
 import sys
+import tempfile
+import time
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
 from utils.http_client import create_session
-from typing import Dict, Optional, Iterator
+import requests
+from typing import Dict, Optional, Iterable, Iterator, Tuple
 from urllib.parse import urljoin
 
 
+@functools.lru_cache(maxsize=65536)
+def _canon(resource: str) -> str:
+    """规范化资源路径（小写、统一使用 '/'），同一资源反复查询时直接命中缓存"""
+    return resource.lower().replace('\\', '/')
+
+
 class CacheError(Exception):
     """缓存相关错误"""
     pass
 
 
+class HashMismatchError(CacheError):
+    """下载的文件与索引中的哈希不一致"""
+    pass
+
+
 class IndexEntry:
     """索引条目"""
+    __slots__ = ('path', 'hash', 'size')
+    
     def __init__(self, path: str, hash_value: str, size: int):
         self.path = path
         self.hash = hash_value
         self.size = size
 
 
+class _IndexView:
+    """两个索引键的联合只读视图，支持迭代、len 和 in，不复制键"""
+    __slots__ = ('a', 'b')
+    
+    def __init__(self, a, b):
+        self.a = a
+        self.b = b
+    
+    def __iter__(self) -> Iterator[str]:
+        return itertools.chain(iter(self.a), iter(self.b))
+    
+    def __len__(self) -> int:
+        return len(self.a) + len(self.b)
+    
+    def __contains__(self, resource) -> bool:
+        return resource in self.a or resource in self.b
+
+
 class SharedCache:
     """共享缓存接口"""
     
     def client_version(self) -> str:
         raise NotImplementedError
     
-    def iter_resources(self) -> Iterator[str]:
+    def iter_resources(self) -> Iterable[str]:
         raise NotImplementedError
     
     def has_resource(self, resource: str) -> bool:
@@ -41,9 +79,23 @@ class SharedCache:
     def fetch(self, resource: str) -> bytes:
         raise NotImplementedError
     
+    def prefetch(self, resources: Iterable[str]):
+        """确保多个资源都已在本地缓存中（不读回内容）"""
+        for resource in resources:
+            self.path_of(resource)
+    
+    def open_mmap(self, resource: str) -> mmap.mmap:
+        """以只读内存映射方式打开资源，适合顺序解析的大文件"""
+        with open(self.path_of(resource), 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
     def path_of(self, resource: str) -> Path:
         raise NotImplementedError
     
+    def local_path(self, resource: str) -> Path:
+        """资源在本地缓存中的路径，不保证文件已下载（之后用 prefetch 或 path_of 下载）"""
+        return self.path_of(resource)
+    
     def hash_of(self, resource: str) -> str:
         raise NotImplementedError
 
@@ -51,8 +103,13 @@ class SharedCache:
 class CacheDownloader(SharedCache):
     """提供对游戏文件CDN的访问，创建本地磁盘缓存"""
     
-    def __init__(self, cache_dir: Path, user_agent: str, use_macos_build: bool = False):
+    # 下载时按块流式写入磁盘，同时计算MD5
+    CHUNK_SIZE = 1 << 20
+    
+    def __init__(self, cache_dir: Path, user_agent: str, use_macos_build: bool = False,
+                 verify_hashes: bool = True):
         self.cache_dir = Path(cache_dir)
+        self.verify_hashes = verify_hashes
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
         # 检查是否误指向游戏安装目录
@@ -72,6 +129,10 @@ class CacheDownloader(SharedCache):
         self._client_version = client_data.get('build_number', client_data.get('buildNumber', 0))
         self.app_index: Dict[str, IndexEntry] = {}
         self.res_index: Dict[str, IndexEntry] = {}
+        # 未规范化的资源路径 -> 哈希；大量物品共用同一图标和技术等级覆盖层
+        self._hash_memo: Dict[str, str] = {}
+        # 已确认在本地缓存中的资源路径 -> 文件路径，避免重复 stat
+        self._path_memo: Dict[str, Path] = {}
         
         # 下载并解析索引文件
         index_filename = f"eveonline_{self._client_version}.txt"
@@ -89,117 +150,171 @@ class CacheDownloader(SharedCache):
     
     def _load_index(self, content: str, index_dict: Dict[str, IndexEntry]):
         """解析索引文件"""
-        for line in content.strip().split('\n'):
-            if not line.strip():
+        # 索引字段本身不含空白，只按行切分（splitlines 同时处理 \r\n），每行 split 一次
+        entry_type = IndexEntry
+        for line in content.splitlines():
+            if not line:
                 continue
-            parts = line.split(',')
-            if len(parts) >= 3:
-                resource_path = parts[0].strip()
-                file_path = parts[1].strip()
-                hash_value = parts[2].strip()
-                size = int(parts[3].strip()) if len(parts) > 3 else 0
-                
-                # 规范化资源路径
-                resource_key = resource_path.lower().replace('\\', '/')
-                index_dict[resource_key] = IndexEntry(file_path, hash_value, size)
-    
-    def _ensure_cached(self, file_path: Path, url: str) -> Optional[bytes]:
-        """确保文件已缓存，如果不存在则下载"""
-        if file_path.exists():
-            return None
+            parts = line.split(',', 4)
+            if len(parts) < 3:
+                continue
+            size = int(parts[3]) if len(parts) > 3 else 0
+            
+            # 规范化资源路径
+            resource_key = parts[0].lower().replace('\\', '/')
+            index_dict[resource_key] = entry_type(parts[1], parts[2], size)
+    
+    def _ensure_cached(self, file_path: Path, url: str, expected_hash: Optional[str] = None):
+        """确保文件已缓存，如果不存在则流式下载，并校验索引中的哈希
         
-        response = self.session.get(url)
-        data = response.content
+        请求、读取响应体、哈希校验作为一个整体重试：响应体读到一半连接断开，
+        或下载内容与索引哈希不一致，都会删除临时文件后重新下载。
+        """
+        if file_path.exists():
+            return
         
         file_path.parent.mkdir(parents=True, exist_ok=True)
-        file_path.write_bytes(data)
+        attempts = max(1, self.session.max_retries)
+        for attempt in range(1, attempts + 1):
+            try:
+                self._download_to(file_path, url, expected_hash)
+                return
+            except (requests.RequestException, HashMismatchError):
+                if attempt == attempts:
+                    raise
+                time.sleep(self.session.retry_delay)
+    
+    def _download_to(self, file_path: Path, url: str, expected_hash: Optional[str]):
+        """单次下载：流式写入临时文件并计算MD5，校验通过后原子替换到 file_path"""
+        # 直接使用底层会话，重试由 _ensure_cached 覆盖整个下载过程
+        response = self.session.session.get(url, stream=True, timeout=self.session.default_timeout,
+                                             verify=self.session.verify)
+        try:
+            response.raise_for_status()
+            digest = hashlib.md5()
+            fd, tmp_name = tempfile.mkstemp(dir=file_path.parent, prefix=file_path.name, suffix='.part')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=self.CHUNK_SIZE):
+                        f.write(chunk)
+                        digest.update(chunk)
+                if self.verify_hashes and expected_hash and digest.hexdigest() != expected_hash.lower():
+                    raise HashMismatchError(f"文件哈希校验失败: {url} (期望 {expected_hash}，实际 {digest.hexdigest()})")
+                # 先写临时文件再原子替换，中断或并发下载都不会留下半截文件
+                os.replace(tmp_name, file_path)
+            except BaseException:
+                try:
+                    os.unlink(tmp_name)
+                except OSError:
+                    pass
+                raise
+        finally:
+            response.close()
+    
+    def _locate(self, resource: str) -> Tuple[Path, str, str]:
+        """解析资源对应的本地缓存路径、下载URL和哈希，不做任何I/O"""
+        resource = _canon(resource)
         
-        return data
+        if resource in self.app_index:
+            entry = self.app_index[resource]
+            return self.cache_dir / entry.path, f"https://binaries.eveonline.com/{entry.path}", entry.hash
+        elif resource in self.res_index:
+            entry = self.res_index[resource]
+            return self.cache_dir / entry.path, f"https://resources.eveonline.com/{entry.path}", entry.hash
+        else:
+            raise CacheError(f"资源未找到: {resource}")
     
-    def _fetch_file(self, file_path: Path, url: str) -> bytes:
+    def _fetch_file(self, file_path: Path, url: str, expected_hash: Optional[str] = None) -> bytes:
         """获取文件，优先使用缓存"""
-        cached_data = self._ensure_cached(file_path, url)
-        if cached_data is not None:
-            return cached_data
+        self._ensure_cached(file_path, url, expected_hash)
         return file_path.read_bytes()
     
     def client_version(self) -> str:
         return self._client_version
     
-    def iter_resources(self) -> Iterator[str]:
-        """迭代所有资源路径"""
-        yield from self.app_index.keys()
-        yield from self.res_index.keys()
+    def iter_resources(self) -> _IndexView:
+        """所有资源路径的视图（可迭代，支持 len 和 in）"""
+        return _IndexView(self.app_index, self.res_index)
     
     def has_resource(self, resource: str) -> bool:
-        """检查资源是否存在"""
-        resource = resource.lower().replace('\\', '/')
-        return resource in self.app_index or resource in self.res_index
+        """检查资源是否存在（纯内存查找，不访问文件系统）"""
+        # 索引键都是规范形式，调用方传入的路径通常已经规范，先直接查
+        if resource in self.res_index or resource in self.app_index:
+            return True
+        resource = _canon(resource)
+        return resource in self.res_index or resource in self.app_index
     
     def fetch(self, resource: str) -> bytes:
         """获取资源内容"""
-        resource = resource.lower().replace('\\', '/')
+        return self._fetch_file(*self._locate(resource))
+    
+    def prefetch(self, resources: Iterable[str], max_workers: int = 16):
+        """并发下载多个资源到本地缓存，不读回内容"""
+        # 先解析全部路径（纯字典查找），未知资源在发起任何下载前就报错
+        plan = {resource: self._locate(resource) for resource in resources
+                if resource not in self._path_memo}
+        pending: Dict[Path, Tuple[str, str]] = {}
+        for file_path, url, expected_hash in plan.values():
+            pending.setdefault(file_path, (url, expected_hash))
         
-        if resource in self.app_index:
-            entry = self.app_index[resource]
-            url = f"https://binaries.eveonline.com/{entry.path}"
-            return self._fetch_file(self.cache_dir / entry.path, url)
-        elif resource in self.res_index:
-            entry = self.res_index[resource]
-            url = f"https://resources.eveonline.com/{entry.path}"
-            return self._fetch_file(self.cache_dir / entry.path, url)
-        else:
-            raise CacheError(f"资源未找到: {resource}")
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(self._ensure_cached, file_path, url, expected_hash)
+                       for file_path, (url, expected_hash) in pending.items()]
+            for future in as_completed(futures):
+                future.result()
+        
+        for resource, (file_path, _, _) in plan.items():
+            self._path_memo[resource] = file_path
+    
+    def local_path(self, resource: str) -> Path:
+        """资源在本地缓存中的路径（纯索引查找，不下载）"""
+        file_path = self._path_memo.get(resource)
+        if file_path is None:
+            file_path = self._locate(resource)[0]
+        return file_path
     
     def path_of(self, resource: str) -> Path:
         """获取资源的本地路径，如果不存在则下载"""
-        resource = resource.lower().replace('\\', '/')
-        
-        if resource in self.app_index:
-            entry = self.app_index[resource]
-            file_path = self.cache_dir / entry.path
-            url = f"https://binaries.eveonline.com/{entry.path}"
-            self._ensure_cached(file_path, url)
-            return file_path
-        elif resource in self.res_index:
-            entry = self.res_index[resource]
-            file_path = self.cache_dir / entry.path
-            url = f"https://resources.eveonline.com/{entry.path}"
-            self._ensure_cached(file_path, url)
-            return file_path
-        else:
-            raise CacheError(f"资源未找到: {resource}")
+        file_path = self._path_memo.get(resource)
+        if file_path is None:
+            file_path, url, expected_hash = self._locate(resource)
+            self._ensure_cached(file_path, url, expected_hash)
+            self._path_memo[resource] = file_path
+        return file_path
     
     def hash_of(self, resource: str) -> str:
-        """获取资源的哈希值"""
-        resource = resource.lower().replace('\\', '/')
+        """获取资源的哈希值（按调用方传入的路径记忆，重复查询只需一次字典查找）"""
+        try:
+            return self._hash_memo[resource]
+        except KeyError:
+            pass
         
-        if resource in self.app_index:
-            return self.app_index[resource].hash
-        elif resource in self.res_index:
-            return self.res_index[resource].hash
+        key = _canon(resource)
+        if key in self.app_index:
+            hash_value = self.app_index[key].hash
+        elif key in self.res_index:
+            hash_value = self.res_index[key].hash
         else:
-            raise CacheError(f"资源未找到: {resource}")
+            raise CacheError(f"资源未找到: {key}")
+        self._hash_memo[resource] = hash_value
+        return hash_value
     
     def purge(self, keep_files: list[str]):
         """删除不在当前索引中的本地文件"""
-        valid_paths = set()
-        for entry in self.app_index.values():
-            valid_paths.add(entry.path)
-        for entry in self.res_index.values():
-            valid_paths.add(entry.path)
-        
-        # 添加保留文件
-        for keep_file in keep_files:
-            valid_paths.add(keep_file)
+        # 统一成本地路径分隔符，遍历时直接用字符串比较，不构造 Path 对象
+        valid_paths = {entry.path.replace('/', os.sep) for entry in self.app_index.values()}
+        valid_paths.update(entry.path.replace('/', os.sep) for entry in self.res_index.values())
+        valid_paths.update(keep_file.replace('/', os.sep) for keep_file in keep_files)
         
-        # 遍历缓存目录，删除无效文件
-        for root, dirs, files in os.walk(self.cache_dir):
-            for file in files:
-                file_path = Path(root) / file
-                relative_path = file_path.relative_to(self.cache_dir)
-                if str(relative_path) not in valid_paths:
-                    try:
-                        file_path.unlink()
-                    except Exception:
-                        pass
+        prefix_len = len(os.path.join(str(self.cache_dir), ''))
+        pending = [str(self.cache_dir)]
+        while pending:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    elif entry.path[prefix_len:] not in valid_paths:
+                        try:
+                            os.unlink(entry.path)
+                        except Exception:
+                            pass
@@ -2,17 +2,27 @@
 图标生成核心逻辑模块
 """
 
+import functools
 import hashlib
+import itertools
 import json
+import mmap
 import os
 import shutil
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from enum import Enum
 from pathlib import Path
-from typing import Dict, Set, Optional, Tuple
-from zipfile import ZipFile, ZIP_STORED
+from typing import Dict, Mapping, Set, Optional, Tuple
+from zipfile import ZipFile, ZipInfo, ZIP_STORED
 from PIL import Image, ImageChops
 import numpy as np
 
+try:
+    import simplejpeg
+except ImportError:  # 可选依赖：没有时使用 Pillow 自带的 JPEG 编码
+    simplejpeg = None
+
 from cache import SharedCache
 from sde import TypeInfo
 
@@ -25,6 +35,12 @@ REACTION_GROUPS = [1888, 1889, 1890, 4097]
 # 某些类型有3D模型但使用2D图标
 USE_ICON_INSTEAD_OF_GRAPHIC_GROUPS = [12, 340, 448, 479, 548, 649, 711, 4168]
 
+# --skip_skins 时跳过的分类（SKIN及相关外观物品）
+SKIN_CATEGORIES = frozenset({91, 30, 2118})
+
+# PNG 使用最低的 DEFLATE 等级：64x64 图标体积几乎不变，编码快数倍
+PNG_SAVE_OPTIONS = {'compress_level': 1, 'optimize': False}
+
 
 class IconKind(Enum):
     """图标类型"""
@@ -61,45 +77,69 @@ def techicon_resource_for_metagroup(metagroup_id: int) -> Optional[str]:
     return mapping.get(metagroup_id)
 
 
+def _open_rgba(path: Path) -> Image.Image:
+    """打开图片为RGBA；源文件已是RGBA时直接解码，不再 convert 复制一份"""
+    image = Image.open(path)
+    if image.mode != 'RGBA':
+        return image.convert('RGBA')
+    image.load()
+    return image
+
+
+@functools.lru_cache(maxsize=64)
+def _load_shared_image(path: Path) -> Image.Image:
+    """加载蓝图背景/覆盖层等共用图片，每个文件只解码一次（调用方不得修改返回的图片）"""
+    return _open_rgba(path)
+
+
+@functools.lru_cache(maxsize=64)
+def _load_tech_overlay(path: Path) -> Tuple[Image.Image, Image.Image]:
+    """加载并缩放技术等级覆盖层到16x16，返回 (覆盖层, alpha蒙版)，每个覆盖层只解码和缩放一次"""
+    overlay = _open_rgba(path)
+    if overlay.size != (16, 16):
+        # 覆盖层是 32/64 像素的小图，整数倍缩小用 BOX（区域平均）即可，不需要 Lanczos
+        overlay = overlay.resize((16, 16), Image.Resampling.BOX)
+    return overlay, overlay.getchannel('A')
+
+
 def composite_tech(icon_path: Path, tech_icon_path: Path, out_path: Path):
     """合成技术等级覆盖层"""
-    # 加载并调整主图标大小
-    image = Image.open(icon_path).convert('RGBA')
-    image = image.resize((64, 64), Image.Resampling.LANCZOS)
+    # 加载主图标，尺寸不是64x64时才缩放（SDE中的图标通常已是64x64）
+    image = _open_rgba(icon_path)
+    if image.size != (64, 64):
+        image = image.resize((64, 64), Image.Resampling.LANCZOS)
     
-    # 加载并调整技术等级覆盖层
-    tech_overlay = Image.open(tech_icon_path).convert('RGBA')
-    tech_overlay = tech_overlay.resize((16, 16), Image.Resampling.LANCZOS)
+    # 技术等级覆盖层（已缓存）
+    tech_overlay, tech_mask = _load_tech_overlay(tech_icon_path)
     
     # 在左上角合成覆盖层
-    image.paste(tech_overlay, (0, 0), tech_overlay)
-    image.save(out_path, 'PNG')
+    image.paste(tech_overlay, (0, 0), tech_mask)
+    image.save(out_path, 'PNG', **PNG_SAVE_OPTIONS)
 
 
 def composite_blueprint(background_path: Path, overlay_path: Path, icon_path: Path,
                        tech_icon_path: Optional[Path], out_path: Path):
     """合成蓝图图标"""
-    # 加载背景
-    background = Image.open(background_path).convert('RGBA')
+    # 加载背景（缓存的共用图片，复制后再在其上合成）
+    background = _load_shared_image(background_path).copy()
     
-    # 加载并调整主图标
-    icon = Image.open(icon_path).convert('RGBA')
-    icon = icon.resize((64, 64), Image.Resampling.LANCZOS)
+    # 加载主图标，尺寸不是64x64时才缩放
+    icon = _open_rgba(icon_path)
+    if icon.size != (64, 64):
+        icon = icon.resize((64, 64), Image.Resampling.LANCZOS)
     
     # 合成主图标到背景
     background.paste(icon, (0, 0), icon)
     
-    # 加载覆盖层并使用加法混合
-    overlay = Image.open(overlay_path).convert('RGBA')
-    background = image_add(background, overlay)
+    # 加载覆盖层并使用加法混合（覆盖层的预乘结果按文件缓存，每次只做 add + screen）
+    background = _add_premultiplied(background, *_load_additive_overlay(overlay_path))
     
     # 如果有技术等级覆盖层
     if tech_icon_path:
-        tech_overlay = Image.open(tech_icon_path).convert('RGBA')
-        tech_overlay = tech_overlay.resize((16, 16), Image.Resampling.LANCZOS)
-        background.paste(tech_overlay, (0, 0), tech_overlay)
+        tech_overlay, tech_mask = _load_tech_overlay(tech_icon_path)
+        background.paste(tech_overlay, (0, 0), tech_mask)
     
-    background.save(out_path, 'PNG')
+    background.save(out_path, 'PNG', **PNG_SAVE_OPTIONS)
 
 
 def image_add(img1: Image.Image, img2: Image.Image) -> Image.Image:
@@ -107,35 +147,50 @@ def image_add(img1: Image.Image, img2: Image.Image) -> Image.Image:
     
     正确实现加法混合，只对可见像素（alpha > 0）进行RGB加法。
     对应Rust版本的 pixel_add with blend_alpha=true, premultiply=false
-    """
-    # 转换为numpy数组
-    arr1 = np.array(img1, dtype=np.float32)
-    arr2 = np.array(img2, dtype=np.float32)
     
-    # 分离RGB和Alpha通道
-    rgb1 = arr1[:, :, :3]
-    alpha1 = arr1[:, :, 3]
-    rgb2 = arr2[:, :, :3]
-    alpha2 = arr2[:, :, 3]
-    
-    # 归一化alpha到0-1范围
-    alpha1_norm = alpha1 / 255.0
-    alpha2_norm = alpha2 / 255.0
-    
-    # RGB通道加法混合：只对img2中不透明的像素进行加法
-    # 使用img2的alpha作为权重
-    result_rgb = rgb1 + rgb2 * (alpha2_norm[:, :, np.newaxis])
-    result_rgb = np.clip(result_rgb, 0, 255)
+    全部在 uint8 通道上用 ImageChops 完成，不再经过 float32 数组；
+    安装 pillow-simd 替换 Pillow 后这些运算会走 SSE4/AVX2 实现。
+    """
+    alpha2 = img2.getchannel('A')
+    return _add_premultiplied(img1, _premultiply_alpha(img2, alpha2), alpha2)
+
+
+def _premultiply_alpha(img: Image.Image, alpha: Image.Image) -> Image.Image:
+    """rgb * alpha / 255，整张RGBA图一次 multiply（结果的A通道无意义）"""
+    return ImageChops.multiply(img, Image.merge('RGBA', (alpha, alpha, alpha, alpha)))
+
+
+@functools.lru_cache(maxsize=64)
+def _load_additive_overlay(path: Path) -> Tuple[Image.Image, Image.Image]:
+    """加载加法混合用的覆盖层，返回 (预乘alpha后的图像, alpha通道)，每个文件只计算一次"""
+    overlay = _load_shared_image(path)
+    alpha = overlay.getchannel('A')
+    return _premultiply_alpha(overlay, alpha), alpha
+
+
+def _add_premultiplied(img1: Image.Image, premultiplied: Image.Image, alpha2: Image.Image) -> Image.Image:
+    """image_add 的混合部分，覆盖层已预乘alpha"""
+    # RGB通道加法混合：rgb1 + rgb2 * alpha2 / 255，add 自带饱和到255
+    result = ImageChops.add(img1, premultiplied)
     
     # Alpha通道混合：使用标准的over操作
-    # alpha_out = alpha1 + alpha2 * (1 - alpha1)
-    result_alpha_norm = alpha1_norm + alpha2_norm * (1.0 - alpha1_norm)
-    result_alpha = np.clip(result_alpha_norm * 255.0, 0, 255)
-    
-    # 合并RGB和Alpha
-    result = np.dstack([result_rgb, result_alpha]).astype(np.uint8)
+    # alpha_out = alpha1 + alpha2 * (1 - alpha1)，即 screen 混合，直接原地替换A通道
+    result.putalpha(ImageChops.screen(img1.getchannel('A'), alpha2))
     
-    return Image.fromarray(result, 'RGBA')
+    return result
+
+
+def _save_jpeg(img: Image.Image, to_path: Path):
+    """保存JPEG；安装了 simplejpeg 时RGB图像直接调用 libjpeg-turbo 编码"""
+    if simplejpeg is None or img.mode != 'RGB':
+        # 其余模式统一交给 Pillow：与未安装 simplejpeg 时行为一致，
+        # RGBA 等带透明通道的图像照常报错，而不是静默丢弃alpha
+        img.save(to_path, 'JPEG')
+        return
+    # 质量和色度抽样与 Pillow 默认值（75, 4:2:0）保持一致
+    pixels = np.asarray(img)
+    to_path.write_bytes(simplejpeg.encode_jpeg(pixels, quality=75, colorspace='RGB',
+                                               colorsubsampling='420'))
 
 
 def copy_or_convert(from_path: Path, to_path: Path, resource: str, extension: str):
@@ -145,16 +200,16 @@ def copy_or_convert(from_path: Path, to_path: Path, resource: str, extension: st
     else:
         img = Image.open(from_path)
         if extension == '.png':
-            img.save(to_path, 'PNG')
+            img.save(to_path, 'PNG', **PNG_SAVE_OPTIONS)
         elif extension in ['.jpg', '.jpeg']:
-            img.save(to_path, 'JPEG')
+            _save_jpeg(img, to_path)
         else:
             raise ValueError(f"未知的图像扩展名: {extension}")
 
 
 class IconBuildData:
-    """图标构建数据"""
-    def __init__(self, types: Dict[int, TypeInfo], group_categories: Dict[int, int],
+    """图标构建数据（skip_skins 时 skin_materials 为空）"""
+    def __init__(self, types: Mapping[int, TypeInfo], group_categories: Dict[int, int],
                  icon_files: Dict[int, str], graphics_folders: Dict[int, str],
                  skin_materials: Dict[int, int]):
         self.types = types
@@ -164,6 +219,20 @@ class IconBuildData:
         self.skin_materials = skin_materials
 
 
+class _DeferredDownloadCache(SharedCache):
+    """主循环中只解析资源的本地路径并记下资源，生成图标前再统一并发下载"""
+    
+    def __init__(self, cache: SharedCache):
+        self.cache = cache
+        self.resources: Set[str] = set()
+        self.has_resource = cache.has_resource
+        self.hash_of = cache.hash_of
+    
+    def path_of(self, resource: str) -> Path:
+        self.resources.add(resource)
+        return self.cache.local_path(resource)
+
+
 def build_icon_export(output_mode: str, skip_output_if_fresh: bool, data: IconBuildData,
                      cache: SharedCache, icon_dir: Path, force_rebuild: bool,
                      silent_mode: bool, log_file=None, out=None, show_progress: bool = True, 
@@ -176,10 +245,12 @@ def build_icon_export(output_mode: str, skip_output_if_fresh: bool, data: IconBu
     old_index = set()
     index_path = icon_dir / "cache.csv"
     if index_path.exists():
-        content = index_path.read_bytes()
-        for entry in content.split(b'\x1E'):
-            if entry:
-                old_index.add(entry.decode('utf-8'))
+        # 直接从内存映射整体解码再切分，不先复制出一份 bytes，也不逐条 decode
+        with open(index_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    old_index = set(str(mm, 'utf-8').split('\x1E'))
+                old_index.discard('')
     
     service_metadata: Dict[int, Dict[IconKind, str]] = {}
     new_index: Set[str] = set()
@@ -189,14 +260,31 @@ def build_icon_export(output_mode: str, skip_output_if_fresh: bool, data: IconBu
         new_index.add(filename)
         return filename in old_index and not force_rebuild
     
+    # 需要生成的图标先收集为任务，主循环结束后交给进程池并行合成
+    render_jobs = []
+    scheduled_jobs = set()
+    # (图标资源, 技术等级覆盖层) -> 输出文件名（资源不存在时为 None）
+    icon_filenames: Dict[Tuple[Optional[str], Optional[str]], Optional[str]] = {}
+    
+    def render(func, *args):
+        """登记一个图像生成任务；多个物品共用的同一图标只生成一次"""
+        job = (func, args)
+        if job not in scheduled_jobs:
+            scheduled_jobs.add(job)
+            render_jobs.append(job)
+    
     # 预处理：计算需要处理的物品数量
+    # 测试模式：只处理指定的type_id，直接取出该物品而不遍历全部类型
+    if test_type_id is not None:
+        candidates = [(test_type_id, data.types[test_type_id])] if test_type_id in data.types else []
+    else:
+        candidates = data.types.items()
+    
+    group_categories = data.group_categories
+    skipped_categories = SKIN_CATEGORIES if skip_skins else frozenset()
     processable_types = []
-    for type_id, type_info in data.types.items():
-        # 测试模式：只处理指定的type_id
-        if test_type_id is not None and type_id != test_type_id:
-            continue
-        
-        category_id = data.group_categories.get(type_info.group_id)
+    for type_id, type_info in candidates:
+        category_id = group_categories.get(type_info.group_id)
         if category_id is None:
             if not silent_mode:
                 print(f"\t[!] 分组没有分类: {type_info.group_id}")
@@ -206,8 +294,8 @@ def build_icon_export(output_mode: str, skip_output_if_fresh: bool, data: IconBu
         if type_info.icon_id is None and type_info.graphic_id is None and category_id != 91:
             continue
         
-        # 如果设置了跳过SKIN，则跳过SKIN类型（category_id == 91）
-        if skip_skins and category_id in [91, 30, 2118]:
+        # 如果设置了跳过SKIN，则跳过SKIN相关分类
+        if category_id in skipped_categories:
             continue
         
         processable_types.append((type_id, type_info, category_id))
@@ -216,6 +304,9 @@ def build_icon_export(output_mode: str, skip_output_if_fresh: bool, data: IconBu
     total_count = len(processable_types)
     processed_count = 0
     
+    # 生成任务只记录本地路径，缺失的资源在生成前一次性并发下载
+    deferred_cache = _DeferredDownloadCache(cache)
+    
     for type_id, type_info, category_id in processable_types:
         processed_count += 1
         
@@ -228,12 +319,22 @@ def build_icon_export(output_mode: str, skip_output_if_fresh: bool, data: IconBu
         
         if category_id == 9 or category_id == 34:
             # 蓝图或反应
-            _process_blueprint(type_id, type_info, category_id, data, cache, icon_dir,
-                             is_up_to_date, service_metadata, silent_mode, log_file)
+            _process_blueprint(type_id, type_info, category_id, data, deferred_cache, icon_dir,
+                             is_up_to_date, render, service_metadata, silent_mode, log_file)
         else:
             # 普通物品
-            _process_regular_item(type_id, type_info, category_id, data, cache, icon_dir,
-                                is_up_to_date, service_metadata, silent_mode, log_file)
+            _process_regular_item(type_id, type_info, category_id, data, deferred_cache, icon_dir,
+                                is_up_to_date, render, icon_filenames, service_metadata,
+                                silent_mode, log_file)
+    
+    # 并行生成图标
+    if render_jobs:
+        if show_progress and not silent_mode:
+            print(f"\t生成图标: {len(render_jobs)} 个")
+            if log_file:
+                log_file.write(f"\t生成图标: {len(render_jobs)} 个\n")
+        cache.prefetch(deferred_cache.resources)
+        _run_render_jobs(render_jobs)
     
     # 显示最终完成进度
     if show_progress and not silent_mode:
@@ -241,13 +342,14 @@ def build_icon_export(output_mode: str, skip_output_if_fresh: bool, data: IconBu
         if log_file:
             log_file.write(f"\t构建完成: {processed_count}/{total_count} (100.0%)\n")
     
-    # 保存新索引
-    index_bytes = b'\x1E'.join(filename.encode('utf-8') for filename in sorted(new_index))
-    index_path.write_bytes(index_bytes)
+    # 保存新索引：在后台线程中拼接并写入，与下面的输出生成并行（此后不再修改 new_index）
+    index_writer = ThreadPoolExecutor(max_workers=1)
+    index_saved = index_writer.submit(_write_index, index_path, new_index)
+    index_writer.shutdown(wait=False)
     
     # 计算变更
-    to_remove = [f for f in old_index if f not in new_index]
-    to_add = [f for f in new_index if f not in old_index]
+    to_remove = old_index - new_index
+    to_add = new_index - old_index
     
     # 生成输出
     if len(to_add) == 0 and len(to_remove) == 0 and skip_output_if_fresh:
@@ -268,6 +370,9 @@ def build_icon_export(output_mode: str, skip_output_if_fresh: bool, data: IconBu
         _generate_output(output_mode, output_params, icon_dir, new_index, 
                         service_metadata, old_index, force_rebuild, silent_mode, log_file, cache, data)
     
+    # 等待索引写完（同时把写入时的异常抛出来）
+    index_saved.result()
+    
     # 删除旧文件
     for filename in to_remove:
         try:
@@ -278,9 +383,46 @@ def build_icon_export(output_mode: str, skip_output_if_fresh: bool, data: IconBu
     return len(to_add), len(to_remove)
 
 
+def _write_index(index_path: Path, index: Set[str]):
+    """写入图标索引；读取时只当作集合使用，不需要排序"""
+    # 分隔符是ASCII，先拼接成一个字符串再整体编码，结果与逐条编码相同
+    _write_file_bytes(index_path, '\x1E'.join(index).encode('utf-8'))
+
+
+def _write_file_bytes(path: Path, data: bytes):
+    """用 os.write 直接写入整个文件，不经过缓冲IO包装"""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o666)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
+def _run_render_job(job):
+    """执行单个图像生成任务（在工作进程中运行）"""
+    func, args = job
+    func(*args)
+
+
+def _run_render_jobs(render_jobs):
+    """用进程池并行执行图像生成任务；各任务只读写自己的文件，互不依赖"""
+    workers = min(os.cpu_count() or 1, len(render_jobs))
+    if workers <= 1:
+        for job in render_jobs:
+            _run_render_job(job)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # 遍历结果以便把工作进程中的异常抛回主进程
+        for _ in executor.map(_run_render_job, render_jobs, chunksize=64):
+            pass
+
+
 def _process_blueprint(type_id: int, type_info: TypeInfo, category_id: int,
                       data: IconBuildData, cache: SharedCache, icon_dir: Path,
-                      is_up_to_date, service_metadata: Dict, silent_mode: bool, log_file):
+                      is_up_to_date, render, service_metadata: Dict, silent_mode: bool, log_file):
     """处理蓝图类型图标"""
     
     if type_info.graphic_id and type_info.graphic_id in data.graphics_folders:
@@ -297,34 +439,34 @@ def _process_blueprint(type_id: int, type_info: TypeInfo, category_id: int,
                 service_metadata[type_id][IconKind.BLUEPRINT] = filename
                 
                 if not is_up_to_date(filename):
-                    composite_tech(cache.path_of(icon_resource_bp), 
-                                 cache.path_of(techicon),
-                                 icon_dir / filename)
+                    render(composite_tech, cache.path_of(icon_resource_bp), 
+                                         cache.path_of(techicon),
+                                         icon_dir / filename)
                 
                 if cache.has_resource(icon_resource_bpc):
                     filename = f"bpc;{cache.hash_of(icon_resource_bpc)};{cache.hash_of(techicon)}.png"
                     service_metadata[type_id][IconKind.BLUEPRINT_COPY] = filename
                     
                     if not is_up_to_date(filename):
-                        composite_tech(cache.path_of(icon_resource_bpc),
-                                     cache.path_of(techicon),
-                                     icon_dir / filename)
+                        render(composite_tech, cache.path_of(icon_resource_bpc),
+                                             cache.path_of(techicon),
+                                             icon_dir / filename)
             else:
                 filename = f"bp;{cache.hash_of(icon_resource_bp)}.png"
                 service_metadata.setdefault(type_id, {})[IconKind.ICON] = filename
                 service_metadata[type_id][IconKind.BLUEPRINT] = filename
                 
                 if not is_up_to_date(filename):
-                    copy_or_convert(cache.path_of(icon_resource_bp), icon_dir / filename,
-                                  icon_resource_bp, '.png')
+                    render(copy_or_convert, cache.path_of(icon_resource_bp), icon_dir / filename,
+                                          icon_resource_bp, '.png')
                 
                 if cache.has_resource(icon_resource_bpc):
                     filename = f"bpc;{cache.hash_of(icon_resource_bpc)}.png"
                     service_metadata[type_id][IconKind.BLUEPRINT_COPY] = filename
                     
                     if not is_up_to_date(filename):
-                        copy_or_convert(cache.path_of(icon_resource_bpc), icon_dir / filename,
-                                      icon_resource_bpc, '.png')
+                        render(copy_or_convert, cache.path_of(icon_resource_bpc), icon_dir / filename,
+                                              icon_resource_bpc, '.png')
     
     elif type_info.icon_id and type_info.icon_id in data.icon_files:
         icon_resource = data.icon_files[type_info.icon_id]
@@ -340,7 +482,8 @@ def _process_blueprint(type_id: int, type_info: TypeInfo, category_id: int,
                 service_metadata[type_id][IconKind.RELIC] = filename
                 
                 if not is_up_to_date(filename):
-                    composite_blueprint(
+                    render(
+                        composite_blueprint,
                         cache.path_of("res:/ui/texture/icons/relic.png"),
                         cache.path_of("res:/ui/texture/icons/relic_overlay.png"),
                         cache.path_of(icon_resource),
@@ -356,7 +499,8 @@ def _process_blueprint(type_id: int, type_info: TypeInfo, category_id: int,
                 service_metadata[type_id][IconKind.BLUEPRINT] = filename
                 
                 if not is_up_to_date(filename):
-                    composite_blueprint(
+                    render(
+                        composite_blueprint,
                         cache.path_of("res:/ui/texture/icons/reaction.png"),
                         cache.path_of("res:/ui/texture/icons/bpo_overlay.png"),
                         cache.path_of(icon_resource),
@@ -371,7 +515,8 @@ def _process_blueprint(type_id: int, type_info: TypeInfo, category_id: int,
                 service_metadata[type_id][IconKind.BLUEPRINT] = filename
                 
                 if not is_up_to_date(filename):
-                    composite_blueprint(
+                    render(
+                        composite_blueprint,
                         cache.path_of("res:/ui/texture/icons/bpo.png"),
                         cache.path_of("res:/ui/texture/icons/bpo_overlay.png"),
                         cache.path_of(icon_resource),
@@ -384,7 +529,8 @@ def _process_blueprint(type_id: int, type_info: TypeInfo, category_id: int,
                 service_metadata[type_id][IconKind.BLUEPRINT_COPY] = filename
                 
                 if not is_up_to_date(filename):
-                    composite_blueprint(
+                    render(
+                        composite_blueprint,
                         cache.path_of("res:/ui/texture/icons/bpc.png"),
                         cache.path_of("res:/ui/texture/icons/bpc_overlay.png"),
                         cache.path_of(icon_resource),
@@ -400,7 +546,8 @@ def _process_blueprint(type_id: int, type_info: TypeInfo, category_id: int,
 
 def _process_regular_item(type_id: int, type_info: TypeInfo, category_id: int,
                          data: IconBuildData, cache: SharedCache, icon_dir: Path,
-                         is_up_to_date, service_metadata: Dict, silent_mode: bool, log_file):
+                         is_up_to_date, render, icon_filenames: Dict, service_metadata: Dict,
+                         silent_mode: bool, log_file):
     """处理普通物品图标"""
     
     icon_resource = None
@@ -423,8 +570,8 @@ def _process_regular_item(type_id: int, type_info: TypeInfo, category_id: int,
             service_metadata.setdefault(type_id, {})[IconKind.RENDER] = filename
             
             if not is_up_to_date(filename):
-                copy_or_convert(cache.path_of(render_resource), icon_dir / filename,
-                              render_resource, '.jpg')
+                render(copy_or_convert, cache.path_of(render_resource), icon_dir / filename,
+                                      render_resource, '.jpg')
     
     elif type_info.icon_id and type_info.icon_id in data.icon_files:
         icon_resource = data.icon_files[type_info.icon_id]
@@ -439,25 +586,17 @@ def _process_regular_item(type_id: int, type_info: TypeInfo, category_id: int,
     else:
         return
     
-    # 处理主图标
-    if icon_resource and cache.has_resource(icon_resource):
-        techicon = techicon_resource_for_metagroup(type_info.meta_group_id or 1)
-        
-        if techicon:
-            filename = f"{cache.hash_of(icon_resource)};{cache.hash_of(techicon)}.png"
-            service_metadata.setdefault(type_id, {})[IconKind.ICON] = filename
-            
-            if not is_up_to_date(filename):
-                composite_tech(cache.path_of(icon_resource),
-                             cache.path_of(techicon),
-                             icon_dir / filename)
-        else:
-            filename = f"{cache.hash_of(icon_resource)}.png"
-            service_metadata.setdefault(type_id, {})[IconKind.ICON] = filename
-            
-            if not is_up_to_date(filename):
-                copy_or_convert(cache.path_of(icon_resource), icon_dir / filename,
-                              icon_resource, '.png')
+    # 处理主图标：共用同一图标的物品（如同一材质的SKIN）只解析一次
+    techicon = techicon_resource_for_metagroup(type_info.meta_group_id or 1)
+    icon_key = (icon_resource, techicon)
+    if icon_key in icon_filenames:
+        filename = icon_filenames[icon_key]
+    else:
+        filename = _resolve_main_icon(icon_resource, techicon, cache, icon_dir, is_up_to_date, render)
+        icon_filenames[icon_key] = filename
+    
+    if filename:
+        service_metadata.setdefault(type_id, {})[IconKind.ICON] = filename
     else:
         if not silent_mode:
             print(f"\t[x] 缺失图标: {type_id}")
@@ -465,6 +604,26 @@ def _process_regular_item(type_id: int, type_info: TypeInfo, category_id: int,
             log_file.write(f"\t[x] 缺失图标: {type_id}\n")
 
 
+def _resolve_main_icon(icon_resource: Optional[str], techicon: Optional[str], cache: SharedCache,
+                       icon_dir: Path, is_up_to_date, render) -> Optional[str]:
+    """确定主图标的输出文件名并登记生成任务；资源不存在时返回 None"""
+    if not icon_resource or not cache.has_resource(icon_resource):
+        return None
+    
+    if techicon:
+        filename = f"{cache.hash_of(icon_resource)};{cache.hash_of(techicon)}.png"
+        if not is_up_to_date(filename):
+            render(composite_tech, cache.path_of(icon_resource),
+                                 cache.path_of(techicon),
+                                 icon_dir / filename)
+    else:
+        filename = f"{cache.hash_of(icon_resource)}.png"
+        if not is_up_to_date(filename):
+            render(copy_or_convert, cache.path_of(icon_resource), icon_dir / filename,
+                                  icon_resource, '.png')
+    return filename
+
+
 def _generate_output(output_mode: str, output_params: dict, icon_dir: Path,
                     new_index: Set[str], service_metadata: Dict,
                     old_index: Set[str], force_rebuild: bool, silent_mode: bool, log_file,
@@ -478,11 +637,14 @@ def _generate_output(output_mode: str, output_params: dict, icon_dir: Path,
         if log_file:
             log_file.write(f"写入服务包到 {out_path}\n")
         
-        with ZipFile(out_path, 'w', ZIP_STORED) as zf:
+        def bundle_members():
             for filename in new_index:
                 if log_file:
                     log_file.write(f"\t{filename}\n")
-                zf.write(icon_dir / filename, filename)
+                yield icon_dir / filename, filename
+        
+        with ZipFile(out_path, 'w', ZIP_STORED) as zf:
+            _write_zip_members(zf, bundle_members())
             
             # 写入元数据
             metadata_json = {}
@@ -498,24 +660,23 @@ def _generate_output(output_mode: str, output_params: dict, icon_dir: Path,
         if log_file:
             log_file.write(f"写入IEC归档到 {out_path}\n")
         
-        with ZipFile(out_path, 'w', ZIP_STORED) as zf:
+        def iec_members():
             for type_id, icons in service_metadata.items():
                 for icon_kind, filename in icons.items():
                     if icon_kind == IconKind.ICON:
                         output_name = f"{type_id}_64.png"
-                        if log_file:
-                            log_file.write(f"\t{filename} -> {output_name}\n")
-                        zf.write(icon_dir / filename, output_name)
                     elif icon_kind == IconKind.BLUEPRINT_COPY:
                         output_name = f"{type_id}_bpc_64.png"
-                        if log_file:
-                            log_file.write(f"\t{filename} -> {output_name}\n")
-                        zf.write(icon_dir / filename, output_name)
                     elif icon_kind == IconKind.RENDER:
                         output_name = f"{type_id}_512.jpg"
-                        if log_file:
-                            log_file.write(f"\t{filename} -> {output_name}\n")
-                        zf.write(icon_dir / filename, output_name)
+                    else:
+                        continue
+                    if log_file:
+                        log_file.write(f"\t{filename} -> {output_name}\n")
+                    yield icon_dir / filename, output_name
+        
+        with ZipFile(out_path, 'w', ZIP_STORED) as zf:
+            _write_zip_members(zf, iec_members())
     
     elif output_mode == 'web_dir':
         out_dir = Path(output_params['out'])
@@ -529,6 +690,8 @@ def _generate_output(output_mode: str, output_params: dict, icon_dir: Path,
             log_file.write(f"构建Web目录到 {out_dir} ({mode_name})\n")
         
         created_files = {}
+        # 复制模式下本次已复制的图标: 文件名 -> 第一份副本
+        copied_files: Dict[str, Path] = {}
         index_path = out_dir / 'index.json'
         
         old_links = {}
@@ -558,7 +721,19 @@ def _generate_output(output_mode: str, output_params: dict, icon_dir: Path,
                         log_file.write(f"\t{filename} -> {link_name}\n")
                     
                     if copy_files:
-                        shutil.copy(link_source, link_file)
+                        # 先删除再写：复制出的文件之间可能是硬链接，不能原地覆盖
+                        if link_file.exists():
+                            link_file.unlink()
+                        first_copy = copied_files.get(filename)
+                        if first_copy is None:
+                            shutil.copy(link_source, link_file)
+                            copied_files[filename] = link_file
+                        else:
+                            # 同一图标已复制过一次，其余的直接硬链接到那份副本
+                            try:
+                                os.link(first_copy, link_file)
+                            except OSError:
+                                shutil.copy(link_source, link_file)
                     elif hard_link:
                         if link_file.exists():
                             link_file.unlink()
@@ -634,7 +809,7 @@ def _generate_output(output_mode: str, output_params: dict, icon_dir: Path,
         if log_file:
             log_file.write(f"写入所有图像转储到 {out_path}\n")
         
-        with ZipFile(out_path, 'w', ZIP_STORED) as zf:
+        def image_members():
             for resource in cache.iter_resources():
                 if resource.endswith('png') or resource.endswith('jpg'):
                     parts = resource.split(':/', 1)
@@ -643,5 +818,32 @@ def _generate_output(output_mode: str, output_params: dict, icon_dir: Path,
                     if log_file:
                         log_file.write(f"\t{resource}\n")
                     
-                    resource_path = cache.path_of(resource)
-                    zf.write(resource_path, filename)
+                    yield cache.path_of(resource), filename
+        
+        with ZipFile(out_path, 'w', ZIP_STORED) as zf:
+            _write_zip_members(zf, image_members())
+
+
+def _write_zip_members(zf: ZipFile, members, max_workers: int = 8, prefetch: int = 256):
+    """按顺序把 (源文件, 归档名) 写入zip
+    
+    源文件的 stat 和读取交给线程池提前进行（最多预读 prefetch 个），
+    主线程只负责按原顺序串行追加，输出与逐个 zf.write 相同。
+    members 可以是生成器，会在主线程中按需消费。
+    """
+    def read_member(member):
+        src, arcname = member
+        zinfo = ZipInfo.from_file(src, arcname)
+        zinfo.compress_type = zf.compression
+        with open(src, 'rb') as f:
+            return zinfo, f.read()
+    
+    members = iter(members)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque(executor.submit(read_member, member)
+                        for member in itertools.islice(members, prefetch))
+        while pending:
+            zinfo, content = pending.popleft().result()
+            for member in itertools.islice(members, 1):
+                pending.append(executor.submit(read_member, member))
+            zf.writestr(zinfo, content)
@@ -5,14 +5,27 @@ EVE Online 图标生成器 - Python版本
 """
 
 import argparse
+import cProfile
+import faulthandler
 import sys
 import time
 from pathlib import Path
 from datetime import datetime
 
-from cache import CacheDownloader, CacheError
-from sde import update_sde, read_types, read_group_categories, read_icons, read_graphics, read_skin_materials
-from icons import IconBuildData, build_icon_export, IconError
+# 子命令: (帮助, -o/--out 的帮助, -o 是否必需)
+COMMANDS = {
+    'service_bundle': ('图像服务托管包 (zip含元数据)', '输出文件', True),
+    'iec': ('图像导出集合 (zip)', '输出文件', True),
+    'web_dir': ('准备Web托管目录', '输出目录', True),
+    'checksum': ('打印（或写入）当前图标集的校验和', '输出文件，如果省略则打印到stdout', False),
+    'aux_icons': ('辅助图标转储 (zip)', '输出文件', True),
+    'aux_all': ('辅助所有图像转储 (zip)', '输出文件', True),
+}
+
+# 除 out 之外传给 build_icon_export 的子命令参数: {输出模式: {关键字参数: 命令行参数名}}
+MODE_PARAMS = {
+    'web_dir': {'copy_files': 'copy_files', 'hard_link': 'hardlink'},
+}
 
 
 def main():
@@ -44,77 +57,44 @@ def main():
                        help='跳过SKIN类型图标的构造')
     parser.add_argument('--test_type_id', type=int,
                        help='测试模式：只构造指定typeID的图标')
+    parser.add_argument('--profile', metavar='PATH',
+                       help='用 cProfile 记录本次运行，结果写入PATH（可用 snakeviz 查看）')
     
     # 子命令
     subparsers = parser.add_subparsers(dest='command', required=True,
                                        help='输出模式')
     
-    # service_bundle 子命令
-    service_bundle = subparsers.add_parser('service_bundle',
-                                          help='图像服务托管包 (zip含元数据)')
-    service_bundle.add_argument('-o', '--out', required=True,
-                               help='输出文件')
-    
-    # iec 子命令
-    iec = subparsers.add_parser('iec',
-                               help='图像导出集合 (zip)')
-    iec.add_argument('-o', '--out', required=True,
-                    help='输出文件')
+    command_parsers = {}
+    for name, (command_help, out_help, out_required) in COMMANDS.items():
+        command_parsers[name] = subparsers.add_parser(name, help=command_help)
+        command_parsers[name].add_argument('-o', '--out', required=out_required, help=out_help)
     
-    # web_dir 子命令
-    web_dir = subparsers.add_parser('web_dir',
-                                   help='准备Web托管目录')
-    web_dir.add_argument('-o', '--out', required=True,
-                        help='输出目录')
+    web_dir = command_parsers['web_dir']
     web_dir.add_argument('--copy_files', action='store_true',
                         help='复制图像文件而非创建符号链接')
     web_dir.add_argument('--hardlink', action='store_true',
                         help='使用硬链接而非软链接')
     
-    # checksum 子命令
-    checksum = subparsers.add_parser('checksum',
-                                    help='打印（或写入）当前图标集的校验和')
-    checksum.add_argument('-o', '--out',
-                         help='输出文件，如果省略则打印到stdout')
-    
-    # aux_icons 子命令
-    aux_icons = subparsers.add_parser('aux_icons',
-                                     help='辅助图标转储 (zip)')
-    aux_icons.add_argument('-o', '--out', required=True,
-                          help='输出文件')
-    
-    # aux_all 子命令
-    aux_all = subparsers.add_parser('aux_all',
-                                   help='辅助所有图像转储 (zip)')
-    aux_all.add_argument('-o', '--out', required=True,
-                        help='输出文件')
-    
     args = parser.parse_args()
     
+    # 参数解析完成后再加载图像/缓存相关模块，--help 和参数错误时不必导入
+    from cache import CacheDownloader, CacheError
+    from sde import update_sde, read_icon_build_tables, read_test_type_tables
+    from icons import IconBuildData, build_icon_export, IconError
+    
     # 确定输出模式和参数
     output_mode = args.command
-    output_params = {}
+    output_params = {'out': args.out}
+    for param, arg_name in MODE_PARAMS.get(output_mode, {}).items():
+        output_params[param] = getattr(args, arg_name)
     
-    if output_mode == 'service_bundle':
-        output_params['out'] = args.out
-    elif output_mode == 'iec':
-        output_params['out'] = args.out
-    elif output_mode == 'web_dir':
+    if output_mode == 'web_dir':
         out_path = Path(args.out)
         if not out_path.exists():
             out_path.mkdir(parents=True, exist_ok=True)
         elif out_path.is_file():
             print(f"[x] 输出必须是目录! ({args.out})")
             return 1
-        output_params['out'] = args.out
-        output_params['copy_files'] = args.copy_files
-        output_params['hard_link'] = args.hardlink
-    elif output_mode == 'checksum':
-        output_params['out'] = args.out
-    elif output_mode == 'aux_icons':
-        output_params['out'] = args.out
-    elif output_mode == 'aux_all':
-        output_params['out'] = args.out
     
     silent_mode = args.silent or (output_mode == 'checksum' and not args.out)
     skip_if_fresh = args.skip_if_fresh and not (output_mode == 'checksum' and not args.out)
@@ -123,9 +103,17 @@ def main():
     log_file = None
     if args.logfile:
         mode = 'a' if args.append_log else 'w'
-        log_file = open(args.logfile, mode, encoding='utf-8')
+        # 构建过程中会写入大量短行，用较大的缓冲区合并写入
+        log_file = open(args.logfile, mode, encoding='utf-8', buffering=1 << 16)
         log_file.write(f"图标生成运行, 输出: {output_mode} - {datetime.now()}\n")
     
+    profiler = None
+    if args.profile:
+        # 原生扩展（Pillow、numpy 等）崩溃时也能打印所有线程的调用栈
+        faulthandler.enable()
+        profiler = cProfile.Profile()
+        profiler.enable()
+    
     try:
         start_time = time.time()
         
@@ -149,16 +137,14 @@ def main():
         if log_file:
             log_file.write("加载SDE...\n")
         
+        # 各表解压后缓存在磁盘上，并行读取（跳过SKIN时不读皮肤表）
         sde = update_sde(silent_mode)
-        
-        icon_build_data = IconBuildData(
-            types=read_types(sde, silent_mode),
-            group_categories=read_group_categories(sde, silent_mode),
-            icon_files=read_icons(sde, silent_mode),
-            graphics_folders=read_graphics(sde, silent_mode),
-            skin_materials=read_skin_materials(sde, silent_mode)
-        )
-        
+        if args.test_type_id is not None:
+            # 单项测试只读取该物品引用到的记录
+            tables = read_test_type_tables(sde, args.test_type_id, silent_mode, args.skip_skins)
+        else:
+            tables = read_icon_build_tables(sde, silent_mode, args.skip_skins)
+        icon_build_data = IconBuildData(**tables)
         sde.close()
         data_load_duration = time.time() - data_load_start
         
@@ -188,34 +174,33 @@ def main():
         # 输出统计信息
         total_duration = time.time() - start_time
         
-        s1 = f"完成于: {total_duration:.1f} 秒"
-        s2 = f"\t缓存初始化: {cache_init_duration:.1f} 秒"
-        s3 = f"\t数据加载: {data_load_duration:.1f} 秒"
-        s4 = f"\t图像构建: {build_duration:.1f} 秒 ({added} 新增, {removed} 删除)"
+        summary = '\n'.join([
+            f"完成于: {total_duration:.1f} 秒",
+            f"\t缓存初始化: {cache_init_duration:.1f} 秒",
+            f"\t数据加载: {data_load_duration:.1f} 秒",
+            f"\t图像构建: {build_duration:.1f} 秒 ({added} 新增, {removed} 删除)",
+        ])
         
         if not silent_mode:
-            print(s1)
-            print(s2)
-            print(s3)
-            print(s4)
+            print(summary)
         
         if log_file:
-            log_file.write(s1 + '\n')
-            log_file.write(s2 + '\n')
-            log_file.write(s3 + '\n')
-            log_file.write(s4 + '\n')
+            log_file.write(summary + '\n')
         
         # 清理不必要的缓存文件
-        cache.purge(['sde.zip', 'checksum.txt'])
+        cache.purge(['sde.zip', 'sde.etag', 'sde.version', 'checksum.txt', *sde.cache_files()])
         
         return 0
         
-    except (CacheError, IconError, Exception) as e:
+    except (CacheError, IconError) as e:
         print(f"[x] 错误: {e}", file=sys.stderr)
         if log_file:
             log_file.write(f"[x] 错误: {e}\n")
         return 1
     finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
         if log_file:
             log_file.close()
 
@@ -2,15 +2,34 @@
 SDE (Static Data Export) 数据获取和解析模块
 """
 
+import array
+import contextlib
 import json
+import mmap
+import shutil
 import sys
 import os
 from pathlib import Path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-from utils.http_client import get
-from typing import Dict, Optional, Tuple
+from utils.http_client import default_client, get
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 from zipfile import ZipFile
 import io
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # 没有 orjson 时退回标准库 json
+    orjson = None
+
+# 两者都接受 bytes，逐行解析时不需要先解码
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+# 图标构建用到的SDE表，解压后缓存在磁盘上
+SDE_TABLES = ('types.jsonl', 'groups.jsonl', 'icons.jsonl', 'graphics.jsonl',
+              'skinLicenses.jsonl', 'skinMaterials.jsonl')
 
 
 class TypeInfo:
@@ -23,6 +42,64 @@ class TypeInfo:
         self.meta_group_id = meta_group_id
 
 
+class TypesTable(Mapping):
+    """物品类型表，按列存放在 int32 数组中（结构数组布局，-1 表示 None）
+    
+    比每个物品一个 TypeInfo 对象省内存得多，也便于整列向量化过滤；
+    同时保持 Mapping[int, TypeInfo] 接口，按需构造 TypeInfo 视图。
+    """
+    
+    def __init__(self, type_ids: np.ndarray, group_ids: np.ndarray, icon_ids: np.ndarray,
+                 graphic_ids: np.ndarray, meta_group_ids: np.ndarray):
+        self.type_ids = type_ids
+        self.group_ids = group_ids
+        self.icon_ids = icon_ids
+        self.graphic_ids = graphic_ids
+        self.meta_group_ids = meta_group_ids
+        # 按 type_id 排序的索引，用于二分查找单个物品
+        self._order = np.argsort(type_ids, kind='stable')
+        self._sorted_ids = type_ids[self._order]
+    
+    @staticmethod
+    def _optional(value: int) -> Optional[int]:
+        return None if value < 0 else value
+    
+    def _find(self, type_id) -> int:
+        """返回 type_id 所在的行号，不存在时返回 -1"""
+        pos = int(np.searchsorted(self._sorted_ids, type_id))
+        if pos < len(self._sorted_ids) and self._sorted_ids[pos] == type_id:
+            return int(self._order[pos])
+        return -1
+    
+    def __getitem__(self, type_id: int) -> TypeInfo:
+        if not isinstance(type_id, int):
+            raise KeyError(type_id)
+        row = self._find(type_id)
+        if row < 0:
+            raise KeyError(type_id)
+        optional = self._optional
+        return TypeInfo(int(self.group_ids[row]), optional(int(self.icon_ids[row])),
+                        optional(int(self.graphic_ids[row])), optional(int(self.meta_group_ids[row])))
+    
+    def __contains__(self, type_id) -> bool:
+        return isinstance(type_id, int) and self._find(type_id) >= 0
+    
+    def __iter__(self):
+        return iter(self.type_ids.tolist())
+    
+    def __len__(self) -> int:
+        return len(self.type_ids)
+    
+    def items(self):
+        """按读取顺序产生 (type_id, TypeInfo)；整列转换为Python整数后再逐行构造"""
+        optional = self._optional
+        for type_id, group_id, icon_id, graphic_id, meta_group_id in zip(
+                self.type_ids.tolist(), self.group_ids.tolist(), self.icon_ids.tolist(),
+                self.graphic_ids.tolist(), self.meta_group_ids.tolist()):
+            yield type_id, TypeInfo(group_id, optional(icon_id), optional(graphic_id),
+                                    optional(meta_group_id))
+
+
 def get_sde_version() -> int:
     """获取最新的SDE版本号"""
     response = get("https://binaries.eveonline.com/eveclient_TQ.json")
@@ -34,175 +111,354 @@ def get_sde_version() -> int:
     return build
 
 
-def download_sde(dest_path: Path):
-    """下载SDE数据包"""
-    response = get("https://developers.eveonline.com/static-data/eve-online-static-data-latest-jsonl.zip", 
-                          stream=True)
+SDE_URL = "https://developers.eveonline.com/static-data/eve-online-static-data-latest-jsonl.zip"
+
+# 下载时每次读写的块大小
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+
+def download_sde(dest_path: Path) -> Optional[str]:
+    """下载SDE数据包（复用 http_client 的全局会话），返回响应的 ETag"""
+    response = get(SDE_URL, stream=True)
+    etag = response.headers.get('ETag')
     
-    with open(dest_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
+    # 直接从底层流按 1MiB 块复制，不经过 iter_content 的逐块生成器；
+    # 先写临时文件再替换，下载中断不会留下半截的 sde.zip
+    tmp_path = dest_path.with_name(dest_path.name + '.part')
+    try:
+        response.raw.decode_content = True
+        with open(tmp_path, 'wb') as f:
+            shutil.copyfileobj(response.raw, f, DOWNLOAD_CHUNK_SIZE)
+        os.replace(tmp_path, dest_path)
+    finally:
+        response.close()
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return etag
+
+
+def sde_not_modified(etag: str) -> bool:
+    """用条件 HEAD 请求检查服务器上的SDE包是否仍是 etag 对应的版本
+
+    只请求一次、不重试也不输出（checksum 模式的 stdout 只能有结果）；
+    请求失败或状态码不是 2xx/304 时一律视为已更新，返回 False
+    """
+    client = default_client()
+    try:
+        response = client.session.head(SDE_URL, headers={'If-None-Match': etag},
+                                       timeout=client.default_timeout, allow_redirects=True)
+    except Exception:
+        return False
+    if response.status_code == 304:
+        return True
+    # 有的服务器对 HEAD 忽略条件头，直接返回 200，此时比较 ETag 本身
+    return 200 <= response.status_code < 300 and response.headers.get('ETag') == etag
 
 
 def parse_version(content: str) -> int:
     """解析版本信息"""
     for line in content.strip().split('\n'):
-        data = json.loads(line)
+        data = _json_loads(line)
         if data.get('_key') == 'sde':
             return data.get('build_number', data.get('buildNumber'))
     raise ValueError("未找到SDE版本信息")
 
 
-def update_sde(silent_mode: bool = False) -> ZipFile:
-    """更新SDE数据，返回打开的ZIP文件对象"""
+class _MappedFile(mmap.mmap):
+    """ZipFile 读取成员时要求文件对象有 seekable()，mmap 在 3.13 之前没有"""
+    
+    def seekable(self) -> bool:
+        return True
+
+
+@contextlib.contextmanager
+def _open_zip(sde_path: Path) -> Iterator[ZipFile]:
+    """在只读内存映射上打开ZIP，读取各成员时不再逐次 seek/read 文件描述符"""
+    with open(sde_path, 'rb') as f:
+        mm = _MappedFile(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        with ZipFile(mm, 'r') as zf:
+            yield zf
+    finally:
+        mm.close()
+
+
+class ExtractedSDE:
+    """解压到 cache/sde_<版本号>/ 下的SDE表，以只读内存映射方式打开
+    
+    同一版本只在第一次使用时解压一次，之后的运行直接映射磁盘文件，
+    不再重复 inflate，也能利用系统页缓存。
+    """
+    
+    SENTINEL = '.complete'
+    
+    def __init__(self, folder: Path):
+        self.folder = Path(folder)
+    
+    def open(self, name: str):
+        """以只读内存映射打开一张表（空文件返回空的 BytesIO）"""
+        with open(self.folder / name, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return io.BytesIO()
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    
+    def cache_files(self) -> List[str]:
+        """相对于缓存目录的文件列表，清理缓存时需要保留"""
+        return [f"{self.folder.name}/{name}" for name in SDE_TABLES + (self.SENTINEL,)]
+    
+    def close(self):
+        pass
+    
+    @classmethod
+    def from_zip(cls, sde_path: Path, cache_dir: Path, version: int) -> 'ExtractedSDE':
+        """确保 sde_path（版本号为 version）的表已解压，并删除其他版本的解压目录"""
+        folder = cache_dir / f"sde_{version}"
+        if not (folder / cls.SENTINEL).exists():
+            folder.mkdir(parents=True, exist_ok=True)
+            with _open_zip(sde_path) as zf:
+                for name in SDE_TABLES:
+                    with zf.open(name) as src, open(folder / name, 'wb') as dst:
+                        shutil.copyfileobj(src, dst, 1 << 20)
+            # 全部解压完成后才写标记，中途失败的目录下次会重新解压
+            (folder / cls.SENTINEL).touch()
+        
+        for stale in cache_dir.glob('sde_*'):
+            if stale.is_dir() and stale != folder:
+                shutil.rmtree(stale, ignore_errors=True)
+        return cls(folder)
+
+
+# read_* 函数既可以读原始ZIP，也可以读解压后的表
+SDESource = Union[ZipFile, ExtractedSDE]
+
+
+def _read_zip_version(sde_path: Path) -> int:
+    """从ZIP内的 _sde.jsonl 读取版本号"""
+    with _open_zip(sde_path) as zf:
+        return parse_version(zf.read('_sde.jsonl').decode('utf-8'))
+
+
+def _read_cached_version(sde_path: Path, version_path: Path) -> int:
+    """已缓存的 sde.zip 的版本号；优先读旁边的 sde.version，没有时从ZIP读取并补写"""
+    try:
+        return int(version_path.read_text())
+    except (OSError, ValueError):
+        version = _read_zip_version(sde_path)
+        version_path.write_text(str(version))
+        return version
+
+
+def update_sde(silent_mode: bool = False) -> ExtractedSDE:
+    """更新SDE数据，返回解压后的SDE表"""
     cache_dir = Path("./cache")
     cache_dir.mkdir(exist_ok=True)
     sde_path = cache_dir / "sde.zip"
+    etag_path = cache_dir / "sde.etag"
+    version_path = cache_dir / "sde.version"
+    
+    # 上次下载记录了 ETag 时先做条件请求，未变化就不再查询版本号
+    if sde_path.exists() and etag_path.exists() and sde_not_modified(etag_path.read_text().strip()):
+        if not silent_mode:
+            print("SDE数据已是最新!")
+        return ExtractedSDE.from_zip(sde_path, cache_dir, _read_cached_version(sde_path, version_path))
     
-    download = True
     new_version = get_sde_version()
     
-    if sde_path.exists():
-        with ZipFile(sde_path, 'r') as zf:
-            version_content = zf.read('_sde.jsonl').decode('utf-8')
-            current_version = parse_version(version_content)
-            download = (current_version != new_version)
+    # 当前版本号记录在 sde.version 中，比较时不需要打开ZIP
+    current_version = _read_cached_version(sde_path, version_path) if sde_path.exists() else None
     
-    if download:
+    if current_version != new_version:
         if not silent_mode:
             print("正在下载新的SDE数据...")
-        download_sde(sde_path)
+        etag = download_sde(sde_path)
+        if etag:
+            etag_path.write_text(etag)
+        elif etag_path.exists():
+            etag_path.unlink()
+        # 记录实际下载到的版本号（只在下载后读一次ZIP）
+        current_version = _read_zip_version(sde_path)
+        version_path.write_text(str(current_version))
     
     if not silent_mode:
         print("SDE数据已是最新!")
     
-    return ZipFile(sde_path, 'r')
+    return ExtractedSDE.from_zip(sde_path, cache_dir, current_version)
 
 
-def read_types(sde: ZipFile, silent_mode: bool = False) -> Dict[int, TypeInfo]:
-    """读取物品类型信息"""
+def _iter_jsonl(sde: SDESource, name: str, only_key: Optional[int] = None):
+    """逐行流式解析 JSONL 表，跳过空行
+    
+    不把整个文件读成 bytes 再切分。已解压的表直接在内存映射上 readline；
+    ZipExtFile 的逐行读取是纯Python实现，外面包一层 BufferedReader 使用C实现的 readline。
+    指定 only_key 时只产生 _key 等于它的那一行，找到后立即停止；
+    不含该数字的行不做JSON解析。
+    """
+    needle = None if only_key is None else str(only_key).encode('ascii')
+    if isinstance(sde, ZipFile):
+        fh = io.BufferedReader(sde.open(name), buffer_size=1 << 16)
+    else:
+        fh = sde.open(name)
+    with fh:
+        for line in iter(fh.readline, b''):
+            if needle is not None:
+                if needle not in line:
+                    continue
+                data = _json_loads(line)
+                if int(data['_key']) == only_key:
+                    yield data
+                    return
+            elif line.strip():
+                yield _json_loads(line)
+
+
+def read_types(sde: SDESource, silent_mode: bool = False,
+               only_key: Optional[int] = None) -> TypesTable:
+    """读取物品类型信息
+    
+    所有 read_* 函数的 only_key 参数：只读取该ID的一条记录，找到后立即停止（用于单项测试）。
+    """
     if not silent_mode:
         print("\t加载物品类型...")
     
-    types = {}
-    content = sde.read('types.jsonl').decode('utf-8')
+    # 先逐列累积到 array.array，最后一次性转成 numpy 数组
+    columns = [array.array('i') for _ in range(5)]
+    type_ids, group_ids, icon_ids, graphic_ids, meta_group_ids = columns
     
-    for line in content.strip().split('\n'):
-        if not line.strip():
-            continue
-        data = json.loads(line)
-        type_id = data['_key']
-        
-        type_info = TypeInfo(
-            group_id=data.get('groupID', 0),
-            icon_id=data.get('iconID'),
-            graphic_id=data.get('graphicID'),
-            meta_group_id=data.get('metaGroupID')
-        )
-        
-        # 过滤：只保留有图标或图形ID的物品，或特定的SKIN组
-        if (type_info.graphic_id is not None or 
-            type_info.icon_id is not None or 
-            (1950 <= type_info.group_id <= 1955) or 
-            type_info.group_id == 4040):
-            types[type_id] = type_info
+    for data in _iter_jsonl(sde, 'types.jsonl', only_key):
+        get = data.get
+        icon_id = get('iconID')
+        graphic_id = get('graphicID')
+        meta_group_id = get('metaGroupID')
+        type_ids.append(int(data['_key']))
+        group_ids.append(get('groupID', 0))
+        icon_ids.append(-1 if icon_id is None else icon_id)
+        graphic_ids.append(-1 if graphic_id is None else graphic_id)
+        meta_group_ids.append(-1 if meta_group_id is None else meta_group_id)
+    
+    type_ids, group_ids, icon_ids, graphic_ids, meta_group_ids = (
+        np.frombuffer(column, dtype=np.int32) if len(column) else np.empty(0, dtype=np.int32)
+        for column in columns)
     
-    return types
+    # 过滤：只保留有图标或图形ID的物品，或特定的SKIN组（整列向量化判断）
+    # 大多数保留的物品都有图标，按命中率从高到低原地合并掩码，不产生中间数组；
+    # 组别 1950..1955 用无符号减法一次比较完成区间判断
+    keep = icon_ids >= 0
+    keep |= graphic_ids >= 0
+    keep |= group_ids == 4040
+    keep |= (group_ids - 1950).view(np.uint32) <= 5
+    
+    return TypesTable(type_ids[keep], group_ids[keep], icon_ids[keep],
+                      graphic_ids[keep], meta_group_ids[keep])
 
 
-def read_group_categories(sde: ZipFile, silent_mode: bool = False) -> Dict[int, int]:
+def read_group_categories(sde: SDESource, silent_mode: bool = False,
+                          only_key: Optional[int] = None) -> Dict[int, int]:
     """读取组别分类映射"""
     if not silent_mode:
         print("\t加载物品分组...")
     
-    group_categories = {}
-    content = sde.read('groups.jsonl').decode('utf-8')
-    
-    for line in content.strip().split('\n'):
-        if not line.strip():
-            continue
-        data = json.loads(line)
-        group_id = data['_key']
-        category_id = data.get('categoryID')
-        if category_id is not None:
-            group_categories[group_id] = category_id
-    
-    return group_categories
+    # _key 统一转成 int；用推导式一次建好字典，不逐条赋值
+    return {int(data['_key']): data['categoryID']
+            for data in _iter_jsonl(sde, 'groups.jsonl', only_key)
+            if data.get('categoryID') is not None}
 
 
-def read_icons(sde: ZipFile, silent_mode: bool = False) -> Dict[int, str]:
+def read_icons(sde: SDESource, silent_mode: bool = False,
+               only_key: Optional[int] = None) -> Dict[int, str]:
     """读取图标文件映射"""
     if not silent_mode:
         print("\t加载图标信息...")
     
-    icon_files = {}
-    content = sde.read('icons.jsonl').decode('utf-8')
-    
-    for line in content.strip().split('\n'):
-        if not line.strip():
-            continue
-        data = json.loads(line)
-        icon_id = data['_key']
-        icon_file = data.get('iconFile')
-        if icon_file:
-            icon_files[icon_id] = icon_file
-    
-    return icon_files
+    return {int(data['_key']): data['iconFile']
+            for data in _iter_jsonl(sde, 'icons.jsonl', only_key)
+            if data.get('iconFile')}
 
 
-def read_graphics(sde: ZipFile, silent_mode: bool = False) -> Dict[int, str]:
+def read_graphics(sde: SDESource, silent_mode: bool = False,
+                  only_key: Optional[int] = None) -> Dict[int, str]:
     """读取图形文件夹映射"""
     if not silent_mode:
         print("\t加载图形信息...")
     
-    graphics_folders = {}
-    content = sde.read('graphics.jsonl').decode('utf-8')
-    
-    for line in content.strip().split('\n'):
-        if not line.strip():
-            continue
-        data = json.loads(line)
-        graphic_id = data['_key']
-        icon_folder = data.get('iconFolder')
-        if icon_folder:
-            graphics_folders[graphic_id] = icon_folder.replace('\\', '/').rstrip('/')
-    
-    return graphics_folders
+    return {int(data['_key']): data['iconFolder'].replace('\\', '/').rstrip('/')
+            for data in _iter_jsonl(sde, 'graphics.jsonl', only_key)
+            if data.get('iconFolder')}
 
 
-def read_skin_materials(sde: ZipFile, silent_mode: bool = False) -> Dict[int, int]:
-    """读取皮肤材质映射"""
+def read_skin_materials(sde: SDESource, silent_mode: bool = False,
+                        only_key: Optional[int] = None) -> Dict[int, int]:
+    """读取皮肤材质映射（许可证物品ID -> 材质ID）"""
     if not silent_mode:
         print("\t加载皮肤信息...")
     
-    # 读取皮肤许可证
-    license_skins = {}
-    content = sde.read('skinLicenses.jsonl').decode('utf-8')
-    for line in content.strip().split('\n'):
-        if not line.strip():
-            continue
-        data = json.loads(line)
-        license_id = data['_key']
-        skin_id = data.get('skinID')
-        if skin_id is not None:
-            license_skins[license_id] = skin_id
-    
-    # 读取皮肤材质
-    skin_materials = {}
-    content = sde.read('skinMaterials.jsonl').decode('utf-8')
-    for line in content.strip().split('\n'):
-        if not line.strip():
-            continue
-        data = json.loads(line)
-        skin_id = data['_key']
-        material_id = data.get('skinMaterialID')
-        if material_id is not None:
-            skin_materials[skin_id] = material_id
+    if only_key is not None:
+        # 单个许可证：先找到它对应的皮肤，再只读那一条皮肤材质
+        license_data = next(_iter_jsonl(sde, 'skinLicenses.jsonl', only_key), None)
+        skin_id = license_data.get('skinID') if license_data else None
+        if skin_id is None:
+            return {}
+        material_data = next(_iter_jsonl(sde, 'skinMaterials.jsonl', skin_id), None)
+        material_id = material_data.get('skinMaterialID') if material_data else None
+        return {} if material_id is None else {only_key: material_id}
     
-    # 映射许可证到材质
-    license_materials = {}
-    for license_id, skin_id in license_skins.items():
-        if skin_id in skin_materials:
-            license_materials[license_id] = skin_materials[skin_id]
+    # 先读皮肤材质，再把许可证直接映射到材质，不保留中间的 许可证 -> 皮肤 字典
+    skin_materials = {int(data['_key']): data['skinMaterialID']
+                      for data in _iter_jsonl(sde, 'skinMaterials.jsonl')
+                      if data.get('skinMaterialID') is not None}
     
+    license_materials = {}
+    for data in _iter_jsonl(sde, 'skinLicenses.jsonl'):
+        material_id = skin_materials.get(data.get('skinID'))
+        if material_id is not None:
+            license_materials[int(data['_key'])] = material_id
     return license_materials
+
+
+def read_test_type_tables(sde: SDESource, type_id: int, silent_mode: bool = False,
+                          skip_skins: bool = False) -> Dict[str, Any]:
+    """单项测试模式：只读取 type_id 及其引用的分组、图标、图形和皮肤记录"""
+    types = read_types(sde, silent_mode, only_key=type_id)
+    tables = {'types': types, 'group_categories': {}, 'icon_files': {},
+              'graphics_folders': {}, 'skin_materials': {}}
+    if type_id not in types:
+        return tables
+    
+    type_info = types[type_id]
+    tables['group_categories'] = read_group_categories(sde, silent_mode, only_key=type_info.group_id)
+    if type_info.icon_id is not None:
+        tables['icon_files'] = read_icons(sde, silent_mode, only_key=type_info.icon_id)
+    if type_info.graphic_id is not None:
+        tables['graphics_folders'] = read_graphics(sde, silent_mode, only_key=type_info.graphic_id)
+    if not skip_skins:
+        tables['skin_materials'] = read_skin_materials(sde, silent_mode, only_key=type_id)
+    return tables
+
+
+def read_icon_build_tables(sde: SDESource, silent_mode: bool = False,
+                           skip_skins: bool = False) -> Dict[str, Any]:
+    """并行读取图标构建需要的全部SDE表，返回 IconBuildData 的关键字参数
+    
+    各表互相独立。已解压的表各自独立映射；读ZIP时每个线程单独打开一次文件，
+    解压时互不争用同一个文件句柄。skip_skins 时不读取皮肤相关的两张表，
+    skin_materials 为空字典（构建时SKIN分类本来就会被跳过）。
+    """
+    readers = {
+        'types': read_types,
+        'group_categories': read_group_categories,
+        'icon_files': read_icons,
+        'graphics_folders': read_graphics,
+    }
+    if not skip_skins:
+        readers['skin_materials'] = read_skin_materials
+    
+    def run(reader):
+        if isinstance(sde, ZipFile):
+            with ZipFile(sde.filename, 'r') as zf:
+                return reader(zf, silent_mode)
+        return reader(sde, silent_mode)
+    
+    with ThreadPoolExecutor(max_workers=len(readers)) as executor:
+        futures = {key: executor.submit(run, reader) for key, reader in readers.items()}
+        tables = {key: future.result() for key, future in futures.items()}
+    tables.setdefault('skin_materials', {})
+    return tables
@@ -7,6 +7,7 @@ EVE SDE 本地化数据提取器
 
 import os
 import re
+import asyncio
 import pickle
 import json
 import shutil
@@ -17,6 +18,14 @@ from collections import defaultdict, Counter
 from typing import Dict, Any, List, Optional, Tuple
 from utils.http_client import create_session
 
+try:
+    import aiohttp
+except ImportError:  # 没有 aiohttp 时退回逐个同步下载
+    aiohttp = None
+
+# 下载pickle文件时按块写入磁盘，不在内存中保留整个文件
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
 class LocalizationExtractor:
     def __init__(self, project_root: Path):
         self.project_root = project_root
@@ -129,22 +138,81 @@ class LocalizationExtractor:
             print("[x] 无法从在线服务器获取resfileindex")
             return None
     
-    def _download_pickle_file(self, lang_code: str, file_path: str) -> Optional[bytes]:
-        """从网络下载pickle文件内容"""
+    def _download_pickle_file(self, lang_code: str, file_path: str, target_file: Path) -> bool:
+        """从网络下载pickle文件，先写临时文件，完成后再替换为 target_file"""
+        tmp_file = target_file.with_name(target_file.name + '.part')
         try:
             # 从EVE资源服务器获取
             download_url = f"https://resources.eveonline.com/{file_path}"
             print(f"[+] 开始下载 {lang_code}...")
             print(f"[+] 下载URL: {download_url}")
             
-            response = self.session.get(download_url, timeout=60)
+            response = self.session.get(download_url, timeout=60, stream=True)
+            try:
+                with open(tmp_file, 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+            finally:
+                response.close()
+            os.replace(tmp_file, target_file)
             
             print(f"[+] {lang_code} 下载完成")
-            return response.content
+            return True
             
         except Exception as e:
             print(f"[x] 下载本地化文件失败 {lang_code}: {e}")
-            return None
+            return False
+        finally:
+            if tmp_file.exists():
+                tmp_file.unlink()
+    
+    async def _fetch_pickle_file(self, session, lang_code: str, file_path: str, target_file: Path,
+                                 retry_count: int = 5, retry_delay: float = 3.0) -> bool:
+        """异步下载单个pickle文件，带重试；边下载边写临时文件，完成后替换为 target_file"""
+        download_url = f"https://resources.eveonline.com/{file_path}"
+        tmp_file = target_file.with_name(target_file.name + '.part')
+        print(f"[+] 开始下载 {lang_code}...")
+        print(f"[+] 下载URL: {download_url}")
+        for attempt in range(retry_count):
+            try:
+                async with session.get(download_url) as response:
+                    response.raise_for_status()
+                    with open(tmp_file, 'wb') as f:
+                        async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+                os.replace(tmp_file, target_file)
+                print(f"[+] {lang_code} 下载完成")
+                return True
+            except Exception as e:
+                if tmp_file.exists():
+                    tmp_file.unlink()
+                if attempt < retry_count - 1:
+                    print(f"[-] 下载失败 (尝试 {attempt + 1}/{retry_count}): {lang_code} - {e}")
+                    await asyncio.sleep(retry_delay)
+                else:
+                    print(f"[x] 下载本地化文件失败 {lang_code}: {e}")
+        return False
+    
+    async def _fetch_pickle_files(self, downloads: Dict[str, Tuple[str, Path]]) -> Dict[str, bool]:
+        """在同一个会话中并发下载多个pickle文件（最多8个并发连接），返回 {语言代码: 是否已保存}"""
+        # 与同步会话一致，不校验SSL证书
+        connector = aiohttp.TCPConnector(limit=8, ssl=False)
+        # 与 requests 的 timeout=60 含义相同：限制连接和每次读取，而不是整个下载（文件较大，且排队等待连接也计入 total）
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=60, sock_read=60)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            tasks = [self._fetch_pickle_file(session, lang_code, file_path, target_file)
+                     for lang_code, (file_path, target_file) in downloads.items()]
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+        return {lang_code: saved is True for lang_code, saved in zip(downloads, results)}
+    
+    def _download_pickle_files(self, downloads: Dict[str, Tuple[str, Path]]) -> Dict[str, bool]:
+        """下载多个pickle文件到各自的目标路径：有 aiohttp 时并发下载，否则逐个同步下载"""
+        if not downloads:
+            return {}
+        if aiohttp is None:
+            return {lang_code: self._download_pickle_file(lang_code, file_path, target_file)
+                    for lang_code, (file_path, target_file) in downloads.items()}
+        return asyncio.run(self._fetch_pickle_files(downloads))
     
     def get_localization_pickles(self) -> Dict[str, str]:
         """
@@ -188,7 +256,9 @@ class LocalizationExtractor:
             skipped_count = 0
             re_downloaded_count = 0
             
-            # 检查并下载缺失的文件
+            # 先检查所有文件，确定需要下载的文件（{语言代码: 是否为重新下载}）
+            pending = {}
+            downloads = {}
             for lang_code, file_path, expected_hash in valid_matches:
                 target_file = self.raw_dir / f"localization_fsd_{lang_code}.pickle"
                 
@@ -206,35 +276,33 @@ class LocalizationExtractor:
                         print(f"    实际哈希: {current_hash}")
                         # 删除旧文件并重新下载
                         target_file.unlink()
-                        # 继续到下载逻辑
-                        pickle_content = self._download_pickle_file(lang_code, file_path)
-                        if pickle_content:
-                            try:
-                                with open(target_file, 'wb') as f:
-                                    f.write(pickle_content)
-                                result[lang_code] = str(target_file)
-                                print(f"[+] 重新下载的pickle文件已保存: {target_file}")
-                                re_downloaded_count += 1
-                            except Exception as e:
-                                print(f"[x] 保存重新下载的pickle文件失败: {e}")
-                        else:
-                            print(f"[!] 无法重新下载本地化pickle文件: {lang_code}")
+                        pending[lang_code] = True
+                        downloads[lang_code] = (file_path, target_file)
                 else:
-                    # 从网络下载pickle文件
                     print(f"[+] 文件不存在，开始下载: {lang_code}")
-                    pickle_content = self._download_pickle_file(lang_code, file_path)
-                    if pickle_content:
-                        # 保存到raw目录
-                        try:
-                            with open(target_file, 'wb') as f:
-                                f.write(pickle_content)
-                            result[lang_code] = str(target_file)
-                            print(f"[+] 网络下载的pickle文件已保存: {target_file}")
-                            downloaded_count += 1
-                        except Exception as e:
-                            print(f"[x] 保存网络下载的pickle文件失败: {e}")
+                    pending[lang_code] = False
+                    downloads[lang_code] = (file_path, target_file)
+            
+            # 并发下载所有缺失或损坏的文件，每个文件下载完成即写入raw目录
+            saved = self._download_pickle_files(downloads)
+            for lang_code, is_redownload in pending.items():
+                target_file = downloads[lang_code][1]
+                if not saved.get(lang_code):
+                    if is_redownload:
+                        print(f"[!] 无法重新下载本地化pickle文件: {lang_code}")
                     else:
                         print(f"[!] 无法下载本地化pickle文件: {lang_code}")
+                    continue
+                result[lang_code] = str(target_file)
+                if is_redownload:
+                    print(f"[+] 重新下载的pickle文件已保存: {target_file}")
+                    re_downloaded_count += 1
+                else:
+                    print(f"[+] 网络下载的pickle文件已保存: {target_file}")
+                    downloaded_count += 1
+            
+            # 结果按resfileindex中的顺序排列
+            result = {lang_code: result[lang_code] for lang_code, _, _ in valid_matches if lang_code in result}
             
             # 显示下载统计
             print(f"[+] 下载统计: 新下载 {downloaded_count} 个文件，重新下载 {re_downloaded_count} 个文件，跳过 {skipped_count} 个正确文件")
@@ -20,7 +20,8 @@ class RetryableHTTPClient:
     """带自动重试机制的HTTP客户端"""
     
     def __init__(self, max_retries: int = 5, retry_delay: float = 3.0, 
-                 default_timeout: int = 30, verify: bool = False):
+                 default_timeout: int = 30, verify: bool = False,
+                 pool_connections: int = 8, pool_maxsize: int = 16):
         """
         初始化HTTP客户端
         
@@ -29,6 +30,8 @@ class RetryableHTTPClient:
             retry_delay: 重试延迟时间（秒），默认3秒
             default_timeout: 默认超时时间（秒），默认30秒
             verify: 是否验证SSL证书，默认False
+            pool_connections: 连接池缓存的主机数，默认8
+            pool_maxsize: 每个主机保持的最大连接数，默认16
         """
         self.max_retries = max_retries
         self.retry_delay = retry_delay
@@ -36,6 +39,10 @@ class RetryableHTTPClient:
         self.verify = verify
         self.session = requests.Session()
         self.session.verify = verify
+        # 同一会话内复用 keep-alive 连接；连接池需足够大，多线程并发请求时不必等待连接
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
     
     def get(self, url: str, **kwargs) -> requests.Response:
         """
@@ -175,6 +182,19 @@ class RetryableHTTPClient:
 _default_client = RetryableHTTPClient()
 
 
+def default_client() -> RetryableHTTPClient:
+    """
+    返回全局默认客户端
+    
+    模块级 get/head/post 都使用它；需要直接持有会话的调用方也用它，
+    与其他模块共享同一个 keep-alive 连接池，而不是各自 create_session()
+    
+    Returns:
+        RetryableHTTPClient实例
+    """
+    return _default_client
+
+
 def get(url: str, **kwargs) -> requests.Response:
     """
     便捷函数：发送GET请求，带自动重试机制
@@ -227,7 +247,8 @@ def post(url: str, **kwargs) -> requests.Response:
 
 
 def create_session(max_retries: int = 5, retry_delay: float = 3.0, 
-                   default_timeout: int = 30, verify: bool = False) -> RetryableHTTPClient:
+                   default_timeout: int = 30, verify: bool = False,
+                   pool_connections: int = 8, pool_maxsize: int = 16) -> RetryableHTTPClient:
     """
     创建一个新的HTTP客户端会话
     
@@ -236,6 +257,8 @@ def create_session(max_retries: int = 5, retry_delay: float = 3.0,
         retry_delay: 重试延迟时间（秒），默认3秒
         default_timeout: 默认超时时间（秒），默认30秒
         verify: 是否验证SSL证书，默认False
+        pool_connections: 连接池缓存的主机数，默认8
+        pool_maxsize: 每个主机保持的最大连接数，默认16
         
     Returns:
         RetryableHTTPClient实例
@@ -244,6 +267,8 @@ def create_session(max_retries: int = 5, retry_delay: float = 3.0,
         max_retries=max_retries,
         retry_delay=retry_delay,
         default_timeout=default_timeout,
-        verify=verify
+        verify=verify,
+        pool_connections=pool_connections,
+        pool_maxsize=pool_maxsize
     )
 